@@ -1,35 +1,16 @@
 import numpy as np
-import pandas as pd
 import math
+from imu_frame import ImuFrame
 
-# 1. Define the structure in numpy, matching the ESP32
-# 'L' = unsigned long (4 bytes)
-# 'h' = signed int16 (2 bytes)
-log_dtype = np.dtype([
-    ('timestamp', np.uint32),  # 4-byte unsigned long
-    ('ax_raw', np.int16),      # 2-byte signed int
-    ('ay_raw', np.int16),
-    ('az_raw', np.int16),
-    ('gx_raw', np.int16),
-    ('gy_raw', np.int16),
-    ('gz_raw', np.int16),
-])
-
-# 2. Load the raw binary file into a numpy array
+# 1. Memory-map the raw binary file (LogEntry layout lives in imu_log.py)
 filename = 'imu_data.csv' # Your binary data file
-data = np.fromfile(filename, dtype=log_dtype)
-
-# 3. Convert the whole thing to a pandas DataFrame
-df = pd.DataFrame(data)
+frame = ImuFrame.from_bin(filename)
 
-# 4. Now, do all your conversions in Python (this is very fast)
-df['ax_g'] = df['ax_raw'] / 16384.0
-df['ay_g'] = df['ay_raw'] / 16384.0
-df['az_g'] = df['az_raw'] / 16384.0
+# 2. Physical units are derived lazily (float32) the first time you use them:
+#    frame.ax_g ... frame.gz_dps, frame.accel_mag, frame.gyro_mag, frame.t
 
-df['gx_dps'] = df['gx_raw'] / 131.0
-df['gy_dps'] = df['gy_raw'] / 131.0
-df['gz_dps'] = df['gz_raw'] / 131.0
+# 3. Only build a pandas DataFrame when you actually need one (plotting / export)
+df = frame[:5].to_dataframe()
 
 # You are now ready for analysis!
 print(df.head())
\ No newline at end of file
@@ -0,0 +1,107 @@
+import sys
+from collections import namedtuple
+
+import numpy as np
+from scipy.signal import find_peaks, peak_prominences
+
+# peaks:      indices of the selected peaks
+# prominence: minimum prominence that selected them
+# height:     minimum height that selected them
+# attempt:    which (prominence, height) step was used, 0 = the strictest
+# accepted:   False if no step gave an acceptable count (the loosest one is returned)
+AdaptivePeaks = namedtuple('AdaptivePeaks', ['peaks', 'prominence', 'height', 'attempt', 'accepted'])
+
+
+# ---- 1. Threshold schedule of test_new_algorithm_2.py ----
+def threshold_schedule(center, spread, prom_mult=0.1, height_mult=0.2,
+                       prom_decay=0.1, height_decay=0.2, attempts=6):
+    """(prominences, heights) tried in turn: spread * prom_mult and center + spread * height_mult,
+    the multipliers shrinking by prom_decay / height_decay at every step."""
+    steps = np.arange(attempts)
+    prominences = spread * prom_mult * prom_decay ** steps
+    heights = center + spread * height_mult * height_decay ** steps
+    return prominences, heights
+
+
+# ---- 2. One scan, then a search over the sorted candidates ----
+def adaptive_find_peaks(sig, prominences, heights, distance=None, min_peaks=3, max_fraction=0.5):
+    """First (prominence, height) pair for which find_peaks finds an acceptable number of peaks.
+
+    Same answer as calling find_peaks(sig, prominence=p, height=h,
+    distance=distance) for each pair in turn and stopping at the first
+    that gives at least min_peaks and fewer than len(sig) * max_fraction
+    peaks, but the signal is scanned once:
+
+    - find_peaks keeps peaks at least `distance` apart greedily, tallest
+      first, so whether a peak survives depends only on taller peaks. A
+      height threshold therefore never changes which of the remaining peaks
+      survive, and the distance selection can be made once over all local
+      maxima.
+    - Prominence is a property of each peak alone, so it is computed once
+      per candidate, and only for those tall enough to matter: candidates
+      are sorted by height, each height threshold is a binary search into
+      that order, and prominences are filled in for the tallest first,
+      stopping at the first acceptable pair.
+
+    If no pair is acceptable the last one is returned, as the retry loop
+    did. (The one possible difference: two peaks within `distance` of each
+    other with exactly equal heights, where find_peaks' own tie order is
+    unspecified.)
+    """
+    sig = np.asarray(sig, dtype=np.float64)
+    prominences = np.atleast_1d(np.asarray(prominences, dtype=np.float64))
+    heights = np.atleast_1d(np.asarray(heights, dtype=np.float64))
+
+    # The loosest height only drops peaks no pair could select
+    candidates, _ = find_peaks(sig, height=heights.min(), distance=distance)
+    by_height = candidates[np.argsort(-sig[candidates], kind='stable')]
+    descending = -sig[by_height]
+    candidate_prominences = np.empty(len(by_height))
+    done = 0
+
+    for attempt, (prominence, height) in enumerate(zip(prominences, heights)):
+        tall = int(np.searchsorted(descending, -height, side='right'))  # candidates with sig >= height
+        if tall > done:
+            candidate_prominences[done:tall] = peak_prominences(sig, by_height[done:tall])[0]
+            done = tall
+        selected = by_height[:tall][candidate_prominences[:tall] >= prominence]
+        if min_peaks <= len(selected) < len(sig) * max_fraction:
+            return AdaptivePeaks(np.sort(selected), float(prominence), float(height), attempt, True)
+    return AdaptivePeaks(np.sort(selected), float(prominence), float(height), attempt, False)
+
+
+# ---- 3. Check against the retry loop on captures ----
+def _retry_loop(sig, prominences, heights, distance):
+    # test_new_algorithm_2.py's loop, one find_peaks call per attempt
+    for attempt, (prominence, height) in enumerate(zip(prominences, heights)):
+        peaks, _ = find_peaks(sig, prominence=prominence, height=height, distance=distance)
+        if len(peaks) >= 3 and len(peaks) < len(sig) / 2:
+            break
+    return peaks, attempt
+
+
+if __name__ == '__main__':
+    import time
+
+    from capture_metadata import capture_metadata, load_frame
+    from envelope import hilbert_envelope
+    from filter_design import butter_bandpass_filter
+
+    for filename in sys.argv[1:]:
+        fs = capture_metadata(filename)['fs']
+        sig = butter_bandpass_filter(load_frame(filename).accel_mag, 0.3, 8.0 if fs > 16 else fs / 2.5, fs)
+        envelope = hilbert_envelope(sig, fs, 0.3)
+        prominences, heights = threshold_schedule(np.median(envelope), np.std(envelope))
+        distance = int(0.5 * fs)
+
+        start = time.perf_counter()
+        looped, loop_attempt = _retry_loop(sig, prominences, heights, distance)
+        loop_s = time.perf_counter() - start
+        start = time.perf_counter()
+        result = adaptive_find_peaks(sig, prominences, heights, distance)
+        single_s = time.perf_counter() - start
+
+        same = np.array_equal(looped, result.peaks) and loop_attempt == result.attempt
+        print(f"{filename}: {len(result.peaks)} peaks at attempt {result.attempt}, "
+              f"{'same as' if same else 'DIFFERENT from'} the loop; "
+              f"{loop_s * 1e3:.1f} ms -> {single_s * 1e3:.1f} ms")
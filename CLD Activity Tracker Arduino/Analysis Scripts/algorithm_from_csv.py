@@ -1,20 +1,14 @@
 import numpy as np
 import pandas as pd
 import matplotlib.pyplot as plt
-from scipy.signal import butter, filtfilt, find_peaks, hilbert
+from scipy.signal import find_peaks
+from filter_design import butter_bandpass_filter
+from envelope import hilbert_envelope
 
 # -------------------------------
-# Bandpass filter function
+# Bandpass filter function: see filter_design.py
 # -------------------------------
-def butter_bandpass_filter(data, lowcut, highcut, fs, order=4):
-    nyq = 0.5 * fs
-    low = lowcut / nyq
-    high = highcut / nyq
-    if not 0 < low < 1 or not 0 < high < 1:
-        raise ValueError(f"Invalid cutoff frequencies: low={low}, high={high}, fs={fs}")
-    b, a = butter(order, [low, high], btype='band')
-    y = filtfilt(b, a, data)
-    return y
+
 # -------------------------------
 # Load CSV
 # -------------------------------
@@ -37,8 +31,8 @@ gyro_filtered = butter_bandpass_filter(df['gyro_mag'], lowcut, highcut, fs)
 # -------------------------------
 # Optional Hilbert envelope
 # -------------------------------
-accel_envelope = np.abs(hilbert(accel_filtered))
-gyro_envelope = np.abs(hilbert(gyro_filtered))
+accel_envelope = hilbert_envelope(accel_filtered, fs, lowcut)
+gyro_envelope = hilbert_envelope(gyro_filtered, fs, lowcut)
 
 # -------------------------------
 # Peak detection
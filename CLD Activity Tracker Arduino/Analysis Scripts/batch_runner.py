@@ -0,0 +1,65 @@
+import os
+import time
+import traceback
+from collections import namedtuple
+from concurrent.futures import ProcessPoolExecutor
+
+import pandas as pd
+
+# summary: one row per item, in input order: whatever func returned, plus 'item' and
+#          'error' ('' on success, else the exception line -- the batch carries on)
+# timings: item, seconds spent in func, worker pid
+BatchResult = namedtuple('BatchResult', ['summary', 'timings'])
+
+_shared = None  # per-worker copy of the objects handed to run_batch(shared=...)
+
+
+def _init_worker(shared):
+    global _shared
+    _shared = shared
+
+
+def _run_one(func, item):
+    start = time.perf_counter()
+    try:
+        row = dict(func(item, _shared) or {})
+        row['error'] = ''
+    except Exception as e:
+        row = {'error': traceback.format_exception_only(e)[-1].strip()}
+    row['item'] = item
+    return row, time.perf_counter() - start, os.getpid()
+
+
+# ---- Batch engine ----
+def run_batch(func, items, workers=None, shared=None):
+    """Fan func(item, shared) out over a process pool and gather the results.
+
+    func must be a module-level function (it is pickled by name) that returns
+    a dict of summary columns. shared is sent to each worker once, at start-up,
+    so expensive read-only objects such as filter coefficients are designed
+    once in the parent instead of once per file. Rows come back in the order
+    of items, so the summary does not depend on the worker count; only the
+    timings do. workers defaults to every core; workers=1 runs in-process.
+    """
+    items = list(items)
+    workers = workers or os.cpu_count() or 1
+    workers = max(1, min(workers, len(items)))
+
+    if workers == 1:
+        _init_worker(shared)
+        outputs = [_run_one(func, item) for item in items]
+    else:
+        with ProcessPoolExecutor(max_workers=workers, initializer=_init_worker,
+                                 initargs=(shared,)) as pool:
+            outputs = list(pool.map(_run_one, [func] * len(items), items))
+
+    rows = [row for row, _, _ in outputs]
+    summary = pd.DataFrame(rows)
+    if len(summary):
+        summary = summary[['item'] + [c for c in summary.columns if c != 'item']]
+    timings = pd.DataFrame({
+        'item': items,
+        'seconds': [seconds for _, seconds, _ in outputs],
+        'worker': [pid for _, _, pid in outputs],
+    })
+    return BatchResult(summary, timings)
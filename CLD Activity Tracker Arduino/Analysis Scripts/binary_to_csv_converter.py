@@ -1,26 +1,74 @@
-import struct
-import math
-import csv
+import sys
+import time
+
+import numpy as np
+from numpy.lib.format import open_memmap
+
+from imu_frame import ImuFrame
+from imu_log import LogEntryReader
 
 input_file = "/Users/annalee/Documents/BME390/imu_data_10_26.bin"
 output_file = "/Users/annalee/Documents/BME390/imu_data_10_26.csv"
 
-# Define the binary record format
-record_struct = struct.Struct("<Lhhhhhh")  # matches LogEntry: unsigned long + 6 int16
-
-with open(input_file, "rb") as f, open(output_file, "w", newline="") as csvfile:
-    writer = csv.writer(csvfile)
-    writer.writerow(["timestamp(ms)", "ax(g)", "ay(g)", "az(g)", "gx(dps)", "gy(dps)", "gz(dps)", "roll(deg)", "pitch(deg)"])
-    
-    while True:
-        chunk = f.read(record_struct.size)
-        if not chunk:
-            break
-        timestamp, ax, ay, az, gx, gy, gz = record_struct.unpack(chunk)
-        ax_g, ay_g, az_g = ax/16384.0, ay/16384.0, az/16384.0
-        gx_dps, gy_dps, gz_dps = gx/131.0, gy/131.0, gz/131.0
-        roll = math.degrees(math.atan2(ay_g, az_g))
-        pitch = math.degrees(math.atan2(-ax_g, math.sqrt(ay_g**2 + az_g**2)))
-        writer.writerow([timestamp, ax_g, ay_g, az_g, gx_dps, gy_dps, gz_dps, roll, pitch])
-
-print(f"✅ Converted {input_file} → {output_file}")
+# Same header the firmware's CSV export uses
+columns = ["timestamp(ms)", "ax(g)", "ay(g)", "az(g)", "gx(dps)", "gy(dps)", "gz(dps)", "roll(deg)", "pitch(deg)"]
+
+csv_fmt = ["%d"] + ["%.6f"] * (len(columns) - 1)
+
+block_size = 262144  # records decoded per chunk (4 MiB of LogEntry data)
+
+
+# ---- 1. Decode a block of LogEntry records into physical units ----
+def convert_block(records):
+    frame = ImuFrame(records)
+    ax_g, ay_g, az_g = frame.accel_g.T
+    roll = np.degrees(np.arctan2(ay_g, az_g))
+    pitch = np.degrees(np.arctan2(-ax_g, np.sqrt(ay_g**2 + az_g**2)))
+    return records['timestamp'], [ax_g, ay_g, az_g, *frame.gyro_dps.T, roll, pitch]
+
+
+# ---- 2. Chunked converters ----
+def convert_to_csv(input_file, output_file, block_size=block_size):
+    reader = LogEntryReader(input_file)
+    with open(output_file, "w", newline="") as csvfile:
+        csvfile.write(",".join(columns) + "\n")
+        for _, records in reader.iter_blocks(block_size):
+            timestamp, values = convert_block(records)
+            np.savetxt(csvfile, np.column_stack([timestamp] + values), fmt=csv_fmt, delimiter=",")
+    return len(reader)
+
+
+def convert_to_npy(input_file, output_file, block_size=block_size):
+    """Binary alternative: a structured .npy with the same columns (uint32 timestamp, float32 values)."""
+    reader = LogEntryReader(input_file)
+    npy_dtype = np.dtype([(columns[0], '<u4')] + [(name, '<f4') for name in columns[1:]])
+    out = open_memmap(output_file, mode="w+", dtype=npy_dtype, shape=(len(reader),))
+    for start, records in reader.iter_blocks(block_size):
+        timestamp, values = convert_block(records)
+        chunk = out[start:start + len(records)]
+        chunk[columns[0]] = timestamp
+        for name, value in zip(columns[1:], values):
+            chunk[name] = value
+    out.flush()
+    return len(reader)
+
+
+def convert(input_file, output_file, block_size=block_size):
+    start = time.perf_counter()
+    if output_file.endswith(".npy"):
+        n_records = convert_to_npy(input_file, output_file, block_size)
+    else:
+        n_records = convert_to_csv(input_file, output_file, block_size)
+    elapsed = time.perf_counter() - start
+    rate = n_records / elapsed if elapsed > 0 else float("inf")
+    print(f"✅ Converted {input_file} → {output_file}")
+    print(f"   {n_records} records in {elapsed:.2f} s ({rate:,.0f} records/s)")
+    return n_records
+
+
+if __name__ == "__main__":
+    # Optional overrides: python binary_to_csv_converter.py in.bin [out.csv|out.npy]
+    if len(sys.argv) > 1:
+        input_file = sys.argv[1]
+        output_file = sys.argv[2] if len(sys.argv) > 2 else input_file.rsplit(".", 1)[0] + ".csv"
+    convert(input_file, output_file)
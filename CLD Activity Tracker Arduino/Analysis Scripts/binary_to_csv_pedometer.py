@@ -1,41 +1,27 @@
 import numpy as np
 import pandas as pd
-from scipy.signal import butter, filtfilt, find_peaks
+from scipy.signal import find_peaks
 import matplotlib.pyplot as plt
+from imu_frame import ImuFrame
+from filter_design import butter_lowpass_filter
+from intervals import drop_short, mask_periods
 
-# ---- 1. Define IMU binary data structure ----
-log_dtype = np.dtype([
-    ('timestamp', np.uint32),  # 4 bytes
-    ('ax_raw', np.int16),      # 2 bytes
-    ('ay_raw', np.int16),
-    ('az_raw', np.int16),
-    ('gx_raw', np.int16),
-    ('gy_raw', np.int16),
-    ('gz_raw', np.int16),
-])
+# ---- 1. IMU binary data structure: see log_dtype in imu_log.py ----
 
 # ---- 2. Load binary IMU file ----
 filename = '/Users/annalee/Documents/BME390/testing files/imu_data_10_27_adam_walk.bin'  # your .bin file from ESP32
-data = np.fromfile(filename, dtype=log_dtype)
+frame = ImuFrame.from_bin(filename)
 
-if len(data) == 0:
+if len(frame) == 0:
     raise ValueError("No IMU data found. Make sure imu_data.bin exists and contains binary samples.")
 
-df = pd.DataFrame(data)
-
 # ---- 3. Convert raw values to physical units ----
-df['ax_g'] = df['ax_raw'] / 16384.0
-df['ay_g'] = df['ay_raw'] / 16384.0
-df['az_g'] = df['az_raw'] / 16384.0
-df['gx_dps'] = df['gx_raw'] / 131.0
-df['gy_dps'] = df['gy_raw'] / 131.0
-df['gz_dps'] = df['gz_raw'] / 131.0
+# ImuFrame derives ax_g…gz_dps lazily in float32 on first access
 
 # ---- 4. Compute acceleration magnitude ----
-accel_mag = np.sqrt(df['ax_g']**2 + df['ay_g']**2 + df['az_g']**2)
-df['accel_mag'] = accel_mag
+accel_mag = frame.accel_mag
 
-print(df.head())
+print(frame[:5].to_dataframe())
 
 plt.figure(figsize=(12, 4))
 plt.plot(accel_mag - np.mean(accel_mag), color='brown', linewidth=1.0)
@@ -48,17 +34,11 @@ plt.show()
 
 
 # ---- 5. Low-pass filter to smooth acceleration magnitude ----
-def butter_lowpass_filter(data, cutoff, fs, order=4):
-    nyquist = 0.5 * fs
-    normal_cutoff = cutoff / nyquist
-    b, a = butter(order, normal_cutoff, btype='low', analog=False)
-    return filtfilt(b, a, data)
-
 # Sampling rate (Hz)
 fs = 50.0  
 
 # Apply low-pass filter (cutoff ~3 Hz for human motion)
-filtered_accel = butter_lowpass_filter(df['accel_mag'], cutoff=3.0, fs=fs)
+filtered_accel = butter_lowpass_filter(frame.accel_mag, cutoff=3.0, fs=fs)
 
 
 # ---- 6. Detect bursts of activity ----
@@ -73,18 +53,10 @@ peaks, _ = find_peaks(filtered_accel, height=threshold, distance=int(fs*1.0))  #
 # Label bursts as contiguous high-activity periods
 activity_mask = filtered_accel > threshold
 
-# Identify contiguous regions above threshold
-activity_periods = []
-start = None
-for i in range(len(activity_mask)):
-    if activity_mask[i] and start is None:
-        start = i
-    elif not activity_mask[i] and start is not None:
-        if i - start > fs * 0.3:  # at least 0.3 seconds long
-            activity_periods.append((start, i))
-        start = None
-if start is not None:
-    activity_periods.append((start, len(activity_mask)))
+# Identify contiguous regions above threshold, at least 0.3 seconds long
+# (a region still open at the end of the recording is kept whatever its length)
+activity_periods = drop_short(mask_periods(activity_mask, include_leading=True, close_at_length=True),
+                              fs * 0.3, keep_end=len(activity_mask))
 
 # ---- 7. Print summary ----
 print(f"Detected {len(activity_periods)} bursts of activity")
@@ -92,7 +64,7 @@ for i, (s, e) in enumerate(activity_periods, 1):
     print(f"  Burst {i}: samples {s}-{e} ({(e - s)/fs:.2f}s)")
 
 # ---- 8. Plot results ----
-t = df['timestamp'].to_numpy() - df['timestamp'].iloc[0]
+t = frame.t * 1000.0  # ms since first sample
 
 plt.figure(figsize=(12, 6))
 plt.plot(t, filtered_accel, 'k-', linewidth=1.0, label='Filtered Accel Magnitude')
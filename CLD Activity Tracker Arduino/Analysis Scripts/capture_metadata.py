@@ -0,0 +1,182 @@
+import json
+import os
+import re
+import warnings
+
+from firmware_csv import read_export, read_export_frame
+from gui_log import GUI_LOG_PREFIX, is_gui_log, read_gui_log
+from imu_archive import ARCHIVE_SUFFIX, ImuArchive
+from imu_frame import ImuFrame
+from imu_log import LogEntryReader
+from timestamps import unwrap_timestamps
+
+SIDECAR_SUFFIX = '.meta.json'
+SIDECAR_VERSION = 2  # 2: fs from the fractional dt_ms of timestamps.py
+RATE_TOLERANCE = 0.1  # filename rate may differ from the measured rate by 10%
+
+PLACEMENTS = {'ankle', 'wrist', 'hand', 'hip', 'waist', 'arm', 'leg'}
+ACTIVITIES = {'walking', 'walk', 'running', 'run', 'stairs'}
+GAITS = {'normal', 'abnormal', 'limp'}
+DEVICE_TOKENS = {'esp32c3', 'esp32', 'imu', 'circuitpy'}  # device names in GUI log filenames
+MONTHS = {'jan', 'feb', 'mar', 'apr', 'may', 'jun', 'jul', 'aug', 'sep', 'oct', 'nov', 'dec'}
+_STEPS_RE = re.compile(r'^s(?:te|et)ps?$')  # 'steps', plus the 'setps' typo
+_RATE_RE = re.compile(r'^(\d+(?:\.\d+)?)hz$')
+
+
+# ---- 1. Labels encoded in the filename ----
+def parse_capture_name(filename):
+    """Extract labels from names like 11-04-25-Anna_Walking_Abnormal_Ankle_88_Steps_40Hz.bin.
+
+    Missing labels come back as None. Handles both the '<date>_<subject>_...'
+    and '<subject>_<date>_...' orderings used in Pedometer Data and the
+    top-level captures, and GUI logs such as
+    acceleration_gyro_data_ESP32C3_IMU_Sid_Walk_30s_wrist_18-Feb-2025_14-39-32.txt.
+    """
+    stem = os.path.splitext(os.path.basename(filename))[0]
+    if stem.startswith(GUI_LOG_PREFIX):
+        stem = stem[len(GUI_LOG_PREFIX):]
+    tokens = [tok for tok in re.split(r'[-_\s]+', stem.lower()) if tok]
+    labels = {'subject': None, 'date': None, 'activity': None, 'gait': None,
+              'placement': None, 'steps': None, 'rate_hz': None}
+
+    # GUI logs carry a '<dd>-<Mon>-<yyyy>' date; take it whole before the digit heuristics
+    date_parts, consumed = [], set()
+    for i in range(1, len(tokens) - 1):
+        if tokens[i] in MONTHS and tokens[i - 1].isdigit() and tokens[i + 1].isdigit():
+            labels['date'] = '-'.join(tokens[i - 1:i + 2])
+            consumed = set(range(i - 1, len(tokens)))  # date and the time-of-day after it
+            break
+
+    for i, tok in enumerate(tokens):
+        if i in consumed:
+            continue
+        rate = _RATE_RE.match(tok)
+        if rate:
+            labels['rate_hz'] = float(rate.group(1))
+        elif _STEPS_RE.match(tok) and i > 0 and tokens[i - 1].isdigit():
+            labels['steps'] = int(tokens[i - 1])
+        elif tok in DEVICE_TOKENS:
+            continue
+        elif tok.isdigit():
+            next_tok = tokens[i + 1] if i + 1 < len(tokens) else ''
+            if not _STEPS_RE.match(next_tok) and len(date_parts) < 3 and not consumed:
+                date_parts.append(tok)
+        elif tok in PLACEMENTS:
+            labels['placement'] = tok
+        elif tok in ACTIVITIES:
+            labels['activity'] = 'walking' if tok.startswith('walk') else tok
+        elif tok in GAITS:
+            labels['gait'] = 'abnormal' if tok in ('abnormal', 'limp') else tok
+        elif labels['subject'] is None and tok.isalpha():
+            labels['subject'] = tok
+    if len(date_parts) == 3:
+        labels['date'] = '-'.join(date_parts)
+    if labels['activity'] and labels['gait'] is None:
+        labels['gait'] = 'normal'
+    return labels
+
+
+# ---- 2. Rate measured from the timestamps ----
+def capture_format(filename):
+    """'bin', 'archive' (imu_archive.py), 'gui_txt', or 'firmware_csv' for everything else."""
+    lower = filename.lower()
+    if lower.endswith('.bin'):
+        return 'bin'
+    if lower.endswith(ARCHIVE_SUFFIX):
+        return 'archive'
+    if is_gui_log(filename):
+        return 'gui_txt'
+    return 'firmware_csv'
+
+
+def read_timestamps(filename):
+    """Timestamp column of any supported capture."""
+    fmt = capture_format(filename)
+    if fmt == 'bin':
+        return LogEntryReader(filename).timestamps
+    if fmt == 'archive':
+        with ImuArchive(filename) as archive:
+            return archive.timestamps
+    if fmt == 'gui_txt':
+        return read_gui_log(filename)[0].timestamp
+    return read_export(filename)['timestamp']
+
+
+def load_frame(filename):
+    """Any supported capture as an ImuFrame."""
+    fmt = capture_format(filename)
+    if fmt == 'bin':
+        return ImuFrame.from_bin(filename)
+    if fmt == 'archive':
+        with ImuArchive(filename) as archive:
+            return archive.to_frame()
+    if fmt == 'gui_txt':
+        return read_gui_log(filename)[0]
+    return read_export_frame(filename)
+
+
+def infer_rate(timestamp):
+    """Sample rate in Hz from the nominal interval (dt_ms) of the unwrapped timeline."""
+    timeline = unwrap_timestamps(timestamp)
+    if timeline.dt_ms <= 0:
+        return None, timeline
+    return 1000.0 / timeline.dt_ms, timeline
+
+
+def _sidecar_path(filename):
+    return filename + SIDECAR_SUFFIX
+
+
+def _file_signature(filename):
+    st = os.stat(filename)
+    return {'size': st.st_size, 'mtime_ns': st.st_mtime_ns}
+
+
+# ---- 3. Cached metadata ----
+def capture_metadata(filename, refresh=False):
+    """Labels, measured rate and basic shape of a capture, cached in a sidecar.
+
+    The sidecar (<capture>.meta.json) is reused as long as the capture's size
+    and mtime are unchanged, so batch runs never rescan a file just to learn
+    its rate. A filename rate that disagrees with the measured one is flagged
+    with 'rate_mismatch' and a warning; 'fs' always holds the measured rate.
+    """
+    filename = os.fspath(filename)
+    signature = _file_signature(filename)
+    sidecar = _sidecar_path(filename)
+    if not refresh and os.path.exists(sidecar):
+        try:
+            with open(sidecar) as f:
+                meta = json.load(f)
+            if meta.get('version') == SIDECAR_VERSION and meta.get('signature') == signature:
+                return meta
+        except (OSError, ValueError):
+            pass  # unreadable sidecar: rebuild it
+
+    labels = parse_capture_name(filename)
+    timestamp = read_timestamps(filename)
+    fs, timeline = infer_rate(timestamp)
+    rate_hz = labels['rate_hz']
+    rate_mismatch = bool(fs and rate_hz and abs(fs - rate_hz) > RATE_TOLERANCE * rate_hz)
+    if rate_mismatch:
+        warnings.warn(f"{os.path.basename(filename)}: filename says {rate_hz:g} Hz "
+                      f"but timestamps say {fs:.2f} Hz; using {fs:.2f} Hz")
+
+    t_ms = timeline.t_ms
+    meta = {
+        'version': SIDECAR_VERSION,
+        'signature': signature,
+        'labels': labels,
+        'fs': fs,
+        'dt_ms': timeline.dt_ms,
+        'rate_mismatch': rate_mismatch,
+        'n_samples': int(len(t_ms)),
+        'duration_s': float(t_ms[-1] - t_ms[0]) / 1000.0 if len(t_ms) else 0.0,
+        'n_segments': int(len(timeline.segments)),
+    }
+    try:
+        with open(sidecar, 'w') as f:
+            json.dump(meta, f, indent=2)
+    except OSError:
+        pass  # read-only data directory: still return the result
+    return meta
@@ -0,0 +1,224 @@
+import sys
+from functools import lru_cache
+
+import numpy as np
+from scipy.signal import butter, sosfilt, sosfilt_zi, sosfiltfilt
+
+FILTER_CACHE_SIZE = 256  # distinct (kind, order, band, fs) designs kept; least recently used go first
+DEFAULT_BLOCK_SIZE = 1 << 20  # samples filtered per block by filtfilt_blockwise
+DEFAULT_TOLERANCE = 1e-6      # blockwise vs whole-array error, relative to the signal's peak
+KINDS = ('lowpass', 'highpass', 'bandpass', 'bandstop')
+
+
+# ---- 1. Memoised Butterworth designs ----
+@lru_cache(maxsize=FILTER_CACHE_SIZE)
+def _design(kind, order, band, fs):
+    sos = butter(order, band if len(band) > 1 else band[0], btype=kind, fs=fs, output='sos')
+    sos.setflags(write=False)  # the cached master; callers get copies
+    return sos
+
+
+def design_sos(kind, order, band, fs):
+    """Butterworth filter as second-order sections, designed once per (kind, order, band, fs).
+
+    band is a cutoff in Hz, or (low, high) for band filters. SOS stays
+    stable at the low normalised cutoffs used here (0.2 Hz at 20-40 Hz),
+    where the b/a polynomial form loses precision. Callers get a copy of
+    the cached design (a few dozen floats; scipy's sosfilt needs a writable
+    array), so nobody can corrupt the cache.
+    """
+    if kind not in KINDS:
+        raise ValueError(f"Unknown filter kind {kind!r}; expected one of {KINDS}")
+    band = tuple(float(f) for f in np.atleast_1d(band))
+    return _design(kind, int(order), band, float(fs)).copy()
+
+
+def bandpass_sos(lowcut, highcut, fs, order=4):
+    return design_sos('bandpass', order, (lowcut, highcut), fs)
+
+
+def lowpass_sos(cutoff, fs, order=4):
+    return design_sos('lowpass', order, cutoff, fs)
+
+
+def cache_info():
+    """Hits / misses / size of the design cache (functools.lru_cache statistics)."""
+    return _design.cache_info()
+
+
+def clear_cache():
+    _design.cache_clear()
+
+
+# ---- 2. Drop-in replacements for the scripts' filter helpers ----
+def butter_bandpass_filter(data, lowcut, highcut, fs, order=4):
+    """Zero-phase Butterworth bandpass (forward-backward, like filtfilt)."""
+    return sosfiltfilt(bandpass_sos(lowcut, highcut, fs, order), data)
+
+
+def butter_lowpass_filter(data, cutoff, fs, order=4):
+    """Zero-phase Butterworth lowpass (forward-backward, like filtfilt)."""
+    return sosfiltfilt(lowpass_sos(cutoff, fs, order), data)
+
+
+# ---- 3. Batched multi-channel filtering ----
+def _default_padlen(sos):
+    # Same default as scipy.signal.sosfiltfilt
+    n_sections = len(sos)
+    return 3 * (2 * n_sections + 1 - min((sos[:, 2] == 0).sum(), (sos[:, 5] == 0).sum()))
+
+
+def filtfilt_channels(sos, block, out=None):
+    """Zero-phase SOS filter of an (n_samples, n_channels) block along axis 0.
+
+    Every channel goes through the same two sosfilt passes, so accel and
+    gyro (or all six axes) cost one call instead of one per channel. The
+    arithmetic runs in the block's own precision: float32 blocks stay
+    float32 end to end, halving memory versus float64. The result is
+    written into out (same shape; allocated if None), so pipelines can
+    reuse one buffer across files. Matches sosfiltfilt's default odd
+    padding, and raises the same ValueError for blocks that are too short.
+    """
+    block = np.asarray(block)
+    if block.dtype not in (np.float32, np.float64):
+        block = block.astype(np.float64)
+    single = block.ndim == 1
+    if single:
+        block = block[:, None]
+    n, channels = block.shape
+    padlen = _default_padlen(sos)
+    if n <= padlen:
+        raise ValueError(f"The length of the input vector x must be greater than padlen, which is {padlen}.")
+
+    dtype = block.dtype
+    sos = np.asarray(sos, dtype=dtype)
+    zi = sosfilt_zi(sos).astype(dtype)[:, :, None]  # (sections, 2, 1): broadcasts over channels
+
+    # Odd extension at both ends, in one buffer
+    ext = np.empty((n + 2 * padlen, channels), dtype=dtype)
+    ext[padlen:padlen + n] = block
+    np.subtract(2 * block[0], block[padlen:0:-1], out=ext[:padlen])
+    np.subtract(2 * block[-1], block[-2:-padlen - 2:-1], out=ext[padlen + n:])
+
+    forward, _ = sosfilt(sos, ext, axis=0, zi=zi * ext[0])
+    del ext
+    backward, _ = sosfilt(sos, forward[::-1], axis=0, zi=zi * forward[-1])
+    del forward
+
+    result = backward[::-1][padlen:padlen + n]
+    if single:
+        result = result[:, 0]
+    if out is None:
+        out = np.empty(result.shape, dtype=dtype)
+    np.copyto(out, result, casting='same_kind')
+    return out
+
+
+def bandpass_channels(block, lowcut, highcut, fs, order=4, out=None):
+    """filtfilt_channels with the cached bandpass design."""
+    return filtfilt_channels(bandpass_sos(lowcut, highcut, fs, order), block, out)
+
+
+def lowpass_channels(block, cutoff, fs, order=4, out=None):
+    """filtfilt_channels with the cached lowpass design."""
+    return filtfilt_channels(lowpass_sos(cutoff, fs, order), block, out)
+
+
+# ---- 4. Blockwise zero-phase filtering for captures larger than RAM ----
+@lru_cache(maxsize=FILTER_CACHE_SIZE)
+def _decay_length(sos_bytes, tol, max_len, chunk=4096):
+    sos = np.frombuffer(sos_bytes).reshape(-1, 6).copy()
+    x = np.zeros(chunk)
+    x[0] = 1.0
+    zi = np.zeros((len(sos), 2))
+    pieces = []
+    for _ in range(0, max_len, chunk):
+        h, zi = sosfilt(sos, x, zi=zi)
+        x[0] = 0.0
+        pieces.append(np.abs(h))
+        # Once the state has died away, the rest of the response is negligible
+        if np.max(np.abs(zi)) < tol * 1e-3:
+            break
+    tail = np.cumsum(np.concatenate(pieces)[::-1])[::-1]  # sum of |h[k:]| for every k
+    return min(int(np.searchsorted(-tail, -tol)), max_len)
+
+
+def impulse_decay_length(sos, tol=DEFAULT_TOLERANCE, max_len=1 << 24):
+    """Shortest L with sum(|h[L:]|) <= tol, h being the filter's impulse response.
+
+    Truncating the filter's memory L samples back changes its output by at
+    most tol * max|x|, which is what bounds the blockwise stitching error.
+    """
+    sos = np.ascontiguousarray(sos, dtype=np.float64)
+    return _decay_length(sos.tobytes(), float(tol), int(max_len))
+
+
+def filtfilt_blockwise(sos, source, n=None, block_size=DEFAULT_BLOCK_SIZE, overlap=None,
+                       tol=DEFAULT_TOLERANCE, out=None):
+    """filtfilt_channels over a long recording, one block at a time.
+
+    source is an array-like (e.g. a memmap column) or a read(start, stop)
+    function returning (m,) or (m, channels) samples, such as
+    lambda a, b: frame[a:b].channels(). Each block is read with `overlap`
+    extra samples on both sides, filtered, and only its middle is kept, so
+    edge transients fall in the discarded margins. The default overlap is
+    impulse_decay_length(sos, tol), which keeps the stitched result within
+    about 2 * tol * max|x| of whole-array filtfilt (one tol per pass) for
+    float64 input; float32 blocks are additionally limited by float32
+    rounding (~1e-5 relative). The true start and end of the recording get
+    the same odd padding as filtfilt. An overlap below filtfilt's padlen is
+    raised to it, so a short last block can always be filtered.
+
+    Peak memory is a few copies of block_size + 2 * overlap samples,
+    independent of the recording length. out may be a memmap (see
+    np.lib.format.open_memmap) so the result never has to fit in RAM either.
+    """
+    read = source if callable(source) else (lambda start, stop: source[start:stop])
+    if n is None:
+        n = len(source)
+    if overlap is None:
+        overlap = impulse_decay_length(sos, tol)
+    # Every block then holds more than filtfilt's padlen samples, the short tail included
+    overlap = max(overlap, _default_padlen(sos))
+
+    for start in range(0, n, block_size):
+        stop = min(start + block_size, n)
+        lo, hi = max(start - overlap, 0), min(stop + overlap, n)
+        filtered = filtfilt_channels(sos, read(lo, hi))
+        if out is None:
+            out = np.empty((n,) + filtered.shape[1:], dtype=filtered.dtype)
+        out[start:stop] = filtered[start - lo:stop - lo]
+    return out
+
+
+if __name__ == '__main__':
+    import time
+    import tracemalloc
+
+    from imu_frame import ImuFrame
+
+    # Check: blockwise vs whole-array on a (tiled) capture, and the memory each needs
+    filename = sys.argv[1]
+    repeats = int(sys.argv[2]) if len(sys.argv) > 2 else 50
+    block_size = int(sys.argv[3]) if len(sys.argv) > 3 else 65536
+    frame = ImuFrame.from_bin(filename)
+    frame = ImuFrame(np.tile(frame.records, repeats))
+    sos = bandpass_sos(0.2, 1.5, 40.0)
+
+    tracemalloc.start()
+    start = time.perf_counter()
+    blockwise = filtfilt_blockwise(sos, lambda a, b: frame[a:b].channels(), len(frame), block_size)
+    blockwise_s = time.perf_counter() - start
+    blockwise_peak = tracemalloc.get_traced_memory()[1] - blockwise.nbytes
+    tracemalloc.stop()
+
+    samples = frame.channels()
+    tracemalloc.start()
+    whole = filtfilt_channels(sos, samples)
+    whole_peak = tracemalloc.get_traced_memory()[1] - whole.nbytes
+    tracemalloc.stop()
+
+    error = np.max(np.abs(blockwise - whole), axis=0) / np.max(np.abs(samples), axis=0)
+    print(f"{len(frame)} samples, blocks of {block_size}, overlap {impulse_decay_length(sos)}: "
+          f"{blockwise_s:.2f} s, max error {np.max(error):.1e} of max|x| (float32)")
+    print(f"Working memory: blockwise {blockwise_peak / 1e6:.1f} MB, whole array {whole_peak / 1e6:.1f} MB")
@@ -0,0 +1,151 @@
+import io
+import re
+from collections import namedtuple
+
+import numpy as np
+import pandas as pd
+
+from imu_frame import ImuFrame
+
+# ---- 1. Known firmware export layouts ----
+# timestamp(ms),ax(g),ay(g),az(g),gx(dps),gy(dps),gz(dps)[,roll(deg),pitch(deg)]
+FIRMWARE_COLUMNS_7 = ['timestamp', 'ax', 'ay', 'az', 'gx', 'gy', 'gz']
+FIRMWARE_COLUMNS_9 = FIRMWARE_COLUMNS_7 + ['roll', 'pitch']
+
+BANNER_PREFIXES = ('>>>', '---')
+DEFAULT_CHUNKSIZE = 262144  # rows per yielded block
+
+# columns:    canonical names, e.g. ['timestamp', 'ax', ..., 'gz', 'roll', 'pitch']
+# units:      'physical' (g / dps, firmware export) or 'raw' (int16 sensor counts)
+# has_header: whether a header row was found (False for bare data dumps)
+# data_start: byte offset of the first data row
+CsvSchema = namedtuple('CsvSchema', ['columns', 'units', 'has_header', 'data_start'])
+
+_NAME_RE = re.compile(r'^\s*([A-Za-z]+)')
+_DATA_END_RE = re.compile(rb'(?m)^[ \t]*[^\d\s]')  # a non-numeric line after the data = closing banner
+
+
+# ---- 2. Schema detection ----
+def _normalise_column(name):
+    # 'timestamp(ms)' -> 'timestamp', 'gz(dps' -> 'gz'
+    match = _NAME_RE.match(name)
+    return match.group(1).lower() if match else name.strip().lower()
+
+
+def detect_schema(filename, max_probe_lines=64):
+    """Skip the export banners and work out the column layout and units."""
+    offset = 0
+    with open(filename, 'rb') as f:
+        for _ in range(max_probe_lines):
+            raw = f.readline()
+            if not raw:
+                break
+            line = raw.decode('utf-8', errors='ignore').strip()
+            if not line or line.startswith(BANNER_PREFIXES):
+                offset += len(raw)
+                continue
+
+            fields = line.split(',')
+            if re.match(r'^[\d.+-]', fields[0]):
+                # No header: firmware rows start with integer millis; infer the layout from the field count
+                if not fields[0].strip().isdigit():
+                    raise ValueError(f"Not a firmware export (timestamp {fields[0]!r}) in {filename}")
+                if len(fields) == len(FIRMWARE_COLUMNS_9):
+                    return CsvSchema(FIRMWARE_COLUMNS_9, 'physical', False, offset)
+                if len(fields) == len(FIRMWARE_COLUMNS_7):
+                    return CsvSchema(FIRMWARE_COLUMNS_7, 'physical', False, offset)
+                raise ValueError(f"Unrecognised {len(fields)}-column layout in {filename}")
+
+            columns = [_normalise_column(name) for name in fields]
+            missing = set(FIRMWARE_COLUMNS_7) - set(columns)
+            if missing:
+                raise ValueError(f"Missing columns {sorted(missing)} in header of {filename}")
+            # Firmware headers carry units ('ax(g)'); bare 'ax' means raw sensor counts
+            units = 'physical' if '(' in line else 'raw'
+            return CsvSchema(columns, units, True, offset + len(raw))
+    raise ValueError(f"No IMU data found in file: {filename}")
+
+
+# ---- 3. Banner-stripping byte stream ----
+class _ExportBody(io.RawIOBase):
+    """Raw stream over just the data rows: stops at the first non-numeric line."""
+
+    def __init__(self, f, start):
+        self._f = f
+        self._f.seek(start)
+        self._at_line_start = True
+        self._done = False
+
+    def readable(self):
+        return True
+
+    def readinto(self, buffer):
+        if self._done:
+            return 0
+        data = self._f.read(len(buffer))
+        if not data:
+            return 0
+        # Only look for the banner at real line starts
+        search_from = 0 if self._at_line_start else data.find(b'\n') + 1
+        if self._at_line_start or search_from > 0:
+            match = _DATA_END_RE.search(data, search_from)
+            if match:
+                data = data[:match.start()]
+                self._done = True
+        self._at_line_start = data.endswith(b'\n')
+        buffer[:len(data)] = data
+        return len(data)
+
+
+# ---- 4. Chunked reader ----
+def block_dtype(schema):
+    value_type = np.int16 if schema.units == 'raw' else np.float32
+    return np.dtype([('timestamp', np.uint32)] + [(name, value_type) for name in schema.columns[1:]])
+
+
+def iter_blocks(filename, chunksize=DEFAULT_CHUNKSIZE, schema=None):
+    """Yield typed numpy structured blocks from a firmware CSV export.
+
+    Banners are stripped, the 7/9-column layout is detected (truncated
+    headers like 'gz(dps' are fine) and the body is parsed with pandas' C
+    engine in chunks, so memory stays bounded by chunksize. Rows cut off
+    mid-write are dropped.
+    """
+    schema = schema or detect_schema(filename)
+    dtype = block_dtype(schema)
+    with open(filename, 'rb') as f:
+        body = io.BufferedReader(_ExportBody(f, schema.data_start), buffer_size=1 << 20)
+        reader = pd.read_csv(body, header=None, names=schema.columns, usecols=range(len(schema.columns)),
+                             dtype=np.float64, engine='c', chunksize=chunksize)
+        for chunk in reader:
+            chunk = chunk.dropna()
+            block = np.empty(len(chunk), dtype=dtype)
+            for name in dtype.names:
+                block[name] = chunk[name].to_numpy()
+            yield block
+
+
+def read_export(filename, chunksize=DEFAULT_CHUNKSIZE):
+    """Whole export as one structured array (see iter_blocks)."""
+    schema = detect_schema(filename)
+    blocks = list(iter_blocks(filename, chunksize, schema))
+    if not blocks:
+        return np.empty(0, dtype=block_dtype(schema))
+    return np.concatenate(blocks)
+
+
+def read_export_frame(filename, chunksize=DEFAULT_CHUNKSIZE):
+    """Load an export straight into an ImuFrame."""
+    schema = detect_schema(filename)
+    accel, gyro = ['ax', 'ay', 'az'], ['gx', 'gy', 'gz']
+    frames = []
+    for block in iter_blocks(filename, chunksize, schema):
+        accel_values = np.column_stack([block[name] for name in accel])
+        gyro_values = np.column_stack([block[name] for name in gyro])
+        if schema.units == 'raw':
+            frames.append(ImuFrame.from_raw(block['timestamp'], accel_values, gyro_values).records)
+        else:
+            frames.append(ImuFrame.from_physical(block['timestamp'], accel_values, gyro_values).records)
+    if not frames:
+        raise ValueError(f"No IMU data found in file: {filename}")
+    return ImuFrame(np.concatenate(frames))
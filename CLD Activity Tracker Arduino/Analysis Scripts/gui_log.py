@@ -0,0 +1,39 @@
+import os
+
+import numpy as np
+import pandas as pd
+
+from imu_frame import ImuFrame
+
+# ---- 1. Layout written by the BLE GUIs ----
+# 2025-01-22 06:44:22.654,ax,ay,az,gx,gy,gz  (wall-clock time, g / dps)
+GUI_LOG_PREFIX = 'acceleration_gyro_data_'
+GUI_COLUMNS = ['time', 'ax', 'ay', 'az', 'gx', 'gy', 'gz']
+GUI_TIME_FORMAT = '%Y-%m-%d %H:%M:%S.%f'
+
+
+def is_gui_log(filename):
+    return os.path.basename(filename).startswith(GUI_LOG_PREFIX)
+
+
+# ---- 2. Reader ----
+def read_gui_log(filename):
+    """Load a GUI acceleration_gyro_data_*.txt log as (ImuFrame, origin).
+
+    The wall-clock column becomes firmware-style millis since the first
+    sample; origin is the wall-clock time of that first sample (ISO string).
+    Rows that do not parse (e.g. a line cut off mid-write) are dropped.
+    """
+    df = pd.read_csv(filename, header=None, names=GUI_COLUMNS, usecols=range(len(GUI_COLUMNS)),
+                     on_bad_lines='skip', engine='c')
+    time = pd.to_datetime(df['time'], format=GUI_TIME_FORMAT, errors='coerce')
+    values = df[GUI_COLUMNS[1:]].apply(pd.to_numeric, errors='coerce')
+    valid = time.notna().to_numpy() & values.notna().all(axis=1).to_numpy()
+    if not valid.any():
+        raise ValueError(f"No IMU data found in file: {filename}")
+
+    time, values = time[valid], values[valid].to_numpy(dtype=np.float64)
+    origin = time.iloc[0]
+    t_ms = ((time - origin).dt.total_seconds() * 1000.0).round().to_numpy(dtype=np.int64)
+    frame = ImuFrame.from_physical(t_ms.astype(np.uint32), values[:, :3], values[:, 3:])
+    return frame, origin.isoformat()
@@ -0,0 +1,250 @@
+import json
+import os
+import sys
+import zipfile
+
+import numpy as np
+
+from firmware_csv import read_export, read_export_frame
+from gui_log import is_gui_log, read_gui_log
+from imu_frame import ACCEL_AXES, ACCEL_LSB_PER_G, GYRO_AXES, GYRO_LSB_PER_DPS, ImuFrame, physical_dtype
+from imu_log import LogEntryReader, log_dtype
+from timestamps import UINT32_RANGE, unwrap_timestamps
+
+# ---- 1. On-disk layout ----
+# A zip of .npy members (readable with np.load), one deflated member per column per chunk:
+#   meta            JSON string: version, n_samples, chunk_size, dt_ms, units, scale factors, source, origin
+#   index           chunk_dtype row per chunk
+#   c000000_t       uint32 timestamp deltas (modulo 2**32, first entry 0)
+#   c000000_axes    (6, n) one contiguous row per axis (ax ay az gx gy gz): int16 counts
+#                   for units 'raw', float32 g / dps for units 'physical' (CSV / GUI exports)
+ARCHIVE_SUFFIX = '.imuz'
+ARCHIVE_VERSION = 2  # 2 added 'units'; version 1 archives are all 'raw'
+DEFAULT_CHUNK_SIZE = 8192  # samples per chunk (~3.4 min at 40 Hz)
+AXES = ACCEL_AXES + GYRO_AXES
+
+chunk_dtype = np.dtype([
+    ('start', np.int64),     # first sample index of the chunk
+    ('count', np.int64),     # samples in the chunk
+    ('ts0', np.uint32),      # raw firmware timestamp of the first sample
+    ('t_min_ms', np.int64),  # unwrapped time of the first sample
+    ('t_max_ms', np.int64),  # unwrapped time of the last sample
+])
+
+
+def _member(k, column):
+    return f'c{k:06d}_{column}'
+
+
+def _record_dtype(units):
+    return log_dtype if units == 'raw' else physical_dtype
+
+
+def _write_member(zf, name, array):
+    with zf.open(name + '.npy', 'w', force_zip64=True) as f:
+        np.lib.format.write_array(f, np.ascontiguousarray(array), allow_pickle=False)
+
+
+# ---- 2. Writer ----
+def write_archive(path, records, chunk_size=DEFAULT_CHUNK_SIZE, source=None, origin=None):
+    """Write LogEntry records (any log_dtype array, e.g. a memmap) as a chunked archive.
+
+    physical_dtype records (ImuFrame.from_physical) are stored as the
+    float32 they hold, so nothing is quantised or clipped. Chunks are built
+    and deflated one at a time, so memory stays bounded by chunk_size apart
+    from the int64 timeline used for the time index.
+    Timestamps are stored exactly (raw uint32, delta encoded); the index holds
+    the unwrapped time span of each chunk (see timestamps.py).
+    """
+    units = 'raw' if records.dtype.names == log_dtype.names else 'physical'
+    columns = _record_dtype(units).names[1:]
+    timeline = unwrap_timestamps(records['timestamp'])
+    n = len(records)
+    index = np.empty((n + chunk_size - 1) // chunk_size, dtype=chunk_dtype)
+
+    with zipfile.ZipFile(path, 'w', compression=zipfile.ZIP_DEFLATED) as zf:
+        for k, start in enumerate(range(0, n, chunk_size)):
+            chunk = records[start:start + chunk_size]
+            ts = chunk['timestamp'].astype(np.uint32)
+            deltas = np.zeros(len(chunk), dtype=np.uint32)
+            np.subtract(ts[1:], ts[:-1], out=deltas[1:])  # wraps modulo 2**32
+            _write_member(zf, _member(k, 't'), deltas)
+            _write_member(zf, _member(k, 'axes'), np.stack([chunk[name] for name in columns]))
+            index[k] = (start, len(chunk), ts[0],
+                        timeline.t_ms[start], timeline.t_ms[start + len(chunk) - 1])
+
+        meta = {
+            'version': ARCHIVE_VERSION,
+            'n_samples': n,
+            'chunk_size': chunk_size,
+            'dt_ms': timeline.dt_ms,
+            'units': units,
+            'accel_lsb_per_g': ACCEL_LSB_PER_G,
+            'gyro_lsb_per_dps': GYRO_LSB_PER_DPS,
+            'source': source,
+            'origin': origin,
+        }
+        _write_member(zf, 'index', index)
+        _write_member(zf, 'meta', np.array(json.dumps(meta)))
+    return index
+
+
+# ---- 3. Reader ----
+class ImuArchive:
+    """Random access to a chunked archive; only the chunks actually read are inflated.
+
+    Mirrors LogEntryReader: window() selects by sample index, time_range()
+    by time, and both return log_dtype records (physical_dtype for archives
+    of physical-unit exports, see units). Times are the unwrapped
+    timeline (milliseconds, same origin as the first raw timestamp), so
+    ranges stay meaningful across rollovers and firmware resets.
+    """
+
+    def __init__(self, filename):
+        self.filename = os.fspath(filename)
+        self._npz = np.load(self.filename, allow_pickle=False)
+        self.meta = json.loads(self._npz['meta'].item())
+        if self.meta['version'] not in (1, ARCHIVE_VERSION):
+            raise ValueError(f"Unsupported archive version {self.meta['version']} in {self.filename}")
+        self.units = self.meta.get('units', 'raw')
+        self.dtype = _record_dtype(self.units)
+        self.index = self._npz['index']
+
+    def __len__(self):
+        return self.meta['n_samples']
+
+    # ---- Single chunks ----
+    def _chunk_timestamps(self, k):
+        deltas = self._npz[_member(k, 't')]
+        ts = np.cumsum(deltas, dtype=np.uint64)
+        ts += self.index['ts0'][k]
+        return (ts % UINT32_RANGE).astype(np.uint32)
+
+    def _chunk_times(self, k):
+        """Unwrapped ms for each sample of chunk k, consistent with unwrap_timestamps."""
+        d = self._npz[_member(k, 't')].astype(np.int64)
+        d[d >= UINT32_RANGE // 2] = round(self.meta['dt_ms'])  # a backwards jump is a reset
+        d[0] = 0
+        return self.index['t_min_ms'][k] + np.cumsum(d)
+
+    def read_chunk(self, k):
+        axes = self._npz[_member(k, 'axes')]
+        records = np.empty(axes.shape[1], dtype=self.dtype)
+        records['timestamp'] = self._chunk_timestamps(k)
+        for i, name in enumerate(self.dtype.names[1:]):
+            records[name] = axes[i]
+        return records
+
+    def iter_chunks(self):
+        """Yield (start_index, records) one chunk at a time."""
+        for k in range(len(self.index)):
+            yield int(self.index['start'][k]), self.read_chunk(k)
+
+    # ---- Selections ----
+    @property
+    def timestamps(self):
+        """Raw timestamp column; only the timestamp members are inflated."""
+        if len(self.index) == 0:
+            return np.empty(0, dtype=np.uint32)
+        return np.concatenate([self._chunk_timestamps(k) for k in range(len(self.index))])
+
+    def window(self, start, stop):
+        """Records [start, stop) by sample index."""
+        start, stop, _ = slice(start, stop).indices(len(self))
+        if start >= stop:
+            return np.empty(0, dtype=self.dtype)
+        first = int(np.searchsorted(self.index['start'], start, side='right')) - 1
+        last = int(np.searchsorted(self.index['start'], stop, side='left'))
+        records = np.concatenate([self.read_chunk(k) for k in range(first, last)])
+        offset = self.index['start'][first]
+        return records[start - offset:stop - offset]
+
+    def time_range(self, t_start_ms, t_end_ms):
+        """Records with t_start_ms <= unwrapped time < t_end_ms.
+
+        The per-chunk min/max index picks the chunks to inflate; everything
+        else stays compressed on disk.
+        """
+        first = int(np.searchsorted(self.index['t_max_ms'], t_start_ms, side='left'))
+        last = int(np.searchsorted(self.index['t_min_ms'], t_end_ms, side='left'))
+        pieces = []
+        for k in range(first, last):
+            t = self._chunk_times(k)
+            keep = (t >= t_start_ms) & (t < t_end_ms)
+            pieces.append(self.read_chunk(k)[keep])
+        if not pieces:
+            return np.empty(0, dtype=self.dtype)
+        return np.concatenate(pieces)
+
+    def to_frame(self):
+        return ImuFrame(self.window(0, len(self)))
+
+    def close(self):
+        self._npz.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+
+# ---- 4. Converters from the existing capture formats ----
+def archive_path(filename):
+    return os.path.splitext(filename)[0] + ARCHIVE_SUFFIX
+
+
+def convert_to_archive(filename, output=None, chunk_size=DEFAULT_CHUNK_SIZE):
+    """Convert a LogEntry .bin, firmware CSV export or GUI acceleration_gyro_data_*.txt log.
+
+    Sensor counts are stored as int16 and physical-unit sources (g / dps) as
+    the float32 they are read into, so readings beyond ±2 g / ±250 dps are
+    kept rather than saturated. verify_archive() checks the result.
+    """
+    output = output or archive_path(filename)
+    origin = None
+    if filename.lower().endswith('.bin'):
+        frame = ImuFrame.from_bin(filename)
+    elif is_gui_log(filename):
+        frame, origin = read_gui_log(filename)
+    else:
+        frame = read_export_frame(filename)
+    if len(frame) == 0:
+        raise ValueError(f"No IMU data found in file: {filename}")
+    write_archive(output, frame.records, chunk_size, source=os.path.basename(filename), origin=origin)
+    return output
+
+
+def _source_columns(filename):
+    # Timestamps and ax..gz exactly as the source file holds them, independent of ImuFrame
+    if filename.lower().endswith('.bin'):
+        records = LogEntryReader(filename).records
+        return records['timestamp'], [records[axis + '_raw'] for axis in AXES]
+    if is_gui_log(filename):
+        records = read_gui_log(filename)[0].records
+        return records['timestamp'], [records[name] for name in records.dtype.names[1:]]
+    records = read_export(filename)
+    return records['timestamp'], [records[axis] for axis in AXES]
+
+
+def verify_archive(filename, output):
+    """Check an archive against the file it was converted from, column by column.
+
+    Raises ValueError naming the first column that differs.
+    """
+    timestamp, columns = _source_columns(filename)
+    with ImuArchive(output) as archive:
+        records = archive.window(0, len(archive))
+    names = records.dtype.names
+    if len(records) != len(timestamp) or not np.array_equal(records['timestamp'], timestamp):
+        raise ValueError(f"{output}: timestamps differ from {filename}")
+    for name, column in zip(names[1:], columns):
+        if not np.array_equal(records[name], column):
+            raise ValueError(f"{output}: {name} differs from {filename}")
+
+
+if __name__ == '__main__':
+    for name in sys.argv[1:]:
+        out = convert_to_archive(name)
+        verify_archive(name, out)
+        print(f"{name} ({os.path.getsize(name)} bytes) -> {out} ({os.path.getsize(out)} bytes), verified")
@@ -0,0 +1,204 @@
+from functools import cached_property
+
+import numpy as np
+import pandas as pd
+
+from imu_log import LogEntryReader, log_dtype
+from timestamps import unwrap_timestamps
+
+# ---- 1. Sensor scale factors (ICM-42670-P defaults: ±2 g, ±250 dps) ----
+ACCEL_LSB_PER_G = 16384.0
+GYRO_LSB_PER_DPS = 131.0
+
+ACCEL_AXES = ('ax', 'ay', 'az')
+GYRO_AXES = ('gx', 'gy', 'gz')
+
+# Records for sources exported in g / dps (CSV, GUI logs): float32, never
+# quantised, so readings past the sensor's range survive as recorded
+physical_dtype = np.dtype([('timestamp', '<u4')]
+                          + [(axis + '_g', '<f4') for axis in ACCEL_AXES]
+                          + [(axis + '_dps', '<f4') for axis in GYRO_AXES])
+
+
+def _to_counts(values, lsb_per_unit, name):
+    # Physical values back to int16 counts, refusing anything the sensor could not have reported
+    counts = np.rint(np.asarray(values, dtype=np.float64) * lsb_per_unit)
+    limits = np.iinfo(np.int16)
+    if len(counts) and (counts.min() < limits.min or counts.max() > limits.max):
+        raise ValueError(f"{name} spans {np.min(values):g} to {np.max(values):g}, outside the "
+                         f"±{-limits.min / lsb_per_unit:g} {name.split('_')[1]} range int16 sensor counts can hold")
+    return counts.astype(np.int16)
+
+
+# ---- 2. Shared IMU frame ----
+class ImuFrame:
+    """IMU capture backed by the raw int16 LogEntry records.
+
+    Only the raw structured array (16 bytes/sample, possibly a memmap) is
+    held up front; sources exported in physical units hold physical_dtype
+    records instead and are never quantised. Physical units and magnitudes
+    are computed on first access in float32 and cached, so a script that
+    only needs accel_mag never materialises the gyro channels. The time
+    base is unwrapped from the firmware's uint32 millis and stays float64,
+    so millisecond resolution survives day-long captures.
+    """
+
+    def __init__(self, records):
+        self.records = records
+
+    @classmethod
+    def from_bin(cls, filename):
+        return cls(LogEntryReader(filename).records)
+
+    @classmethod
+    def from_raw(cls, timestamp, accel_raw, gyro_raw):
+        """Build a frame from raw sensor counts, e.g. the 'ax'...'gz' CSV columns."""
+        records = np.empty(len(timestamp), dtype=log_dtype)
+        records['timestamp'] = timestamp
+        for i, axis in enumerate(ACCEL_AXES):
+            records[axis + '_raw'] = accel_raw[:, i]
+        for i, axis in enumerate(GYRO_AXES):
+            records[axis + '_raw'] = gyro_raw[:, i]
+        return cls(records)
+
+    @classmethod
+    def from_physical(cls, timestamp, accel_g, gyro_dps):
+        """Build a frame from g / dps values, e.g. a CSV export, kept as float32.
+
+        Nothing is quantised or clipped: exports recorded at a wider range
+        than ±2 g / ±250 dps keep their full values.
+        """
+        records = np.empty(len(timestamp), dtype=physical_dtype)
+        records['timestamp'] = timestamp
+        for i, axis in enumerate(ACCEL_AXES):
+            records[axis + '_g'] = accel_g[:, i]
+        for i, axis in enumerate(GYRO_AXES):
+            records[axis + '_dps'] = gyro_dps[:, i]
+        return cls(records)
+
+    def __len__(self):
+        return len(self.records)
+
+    def __getitem__(self, index):
+        """Slicing returns a new frame over a view of the same records."""
+        return ImuFrame(self.records[index])
+
+    # ---- Raw columns (views, no copies) ----
+    @property
+    def timestamp(self):
+        return self.records['timestamp']
+
+    @property
+    def is_physical(self):
+        """True for frames holding g / dps floats rather than sensor counts."""
+        return self.records.dtype.names != log_dtype.names
+
+    def raw(self, axis):
+        """Sensor counts for one axis; a physical frame raises ValueError if they would not fit in int16."""
+        if not self.is_physical:
+            return self.records[axis + '_raw']
+        if axis in ACCEL_AXES:
+            return _to_counts(self.records[axis + '_g'], ACCEL_LSB_PER_G, axis + '_g')
+        return _to_counts(self.records[axis + '_dps'], GYRO_LSB_PER_DPS, axis + '_dps')
+
+    def raw_records(self):
+        """The frame as LogEntry (log_dtype) records; see raw() for physical frames."""
+        if not self.is_physical:
+            return self.records
+        records = np.empty(len(self), dtype=log_dtype)
+        records['timestamp'] = self.timestamp
+        for axis in ACCEL_AXES + GYRO_AXES:
+            records[axis + '_raw'] = self.raw(axis)
+        return records
+
+    # ---- Lazily derived channels (float32, cached) ----
+    @cached_property
+    def timeline(self):
+        """Unwrapped timestamps plus the gap/reset segment index (see timestamps.py)."""
+        return unwrap_timestamps(self.timestamp)
+
+    @cached_property
+    def t(self):
+        """Seconds since the first sample, monotonic across rollovers and resets."""
+        t_ms = self.timeline.t_ms
+        if len(t_ms) == 0:
+            return np.empty(0)
+        return (t_ms - t_ms[0]) / 1000.0
+
+    @cached_property
+    def accel_g(self):
+        """(n, 3) float32 acceleration in g."""
+        out = np.empty((len(self), 3), dtype=np.float32)
+        for i, axis in enumerate(ACCEL_AXES):
+            if self.is_physical:
+                out[:, i] = self.records[axis + '_g']
+            else:
+                np.divide(self.raw(axis), np.float32(ACCEL_LSB_PER_G), out=out[:, i])
+        return out
+
+    @cached_property
+    def gyro_dps(self):
+        """(n, 3) float32 angular rate in degrees per second."""
+        out = np.empty((len(self), 3), dtype=np.float32)
+        for i, axis in enumerate(GYRO_AXES):
+            if self.is_physical:
+                out[:, i] = self.records[axis + '_dps']
+            else:
+                np.divide(self.raw(axis), np.float32(GYRO_LSB_PER_DPS), out=out[:, i])
+        return out
+
+    @property
+    def ax_g(self):
+        return self.accel_g[:, 0]
+
+    @property
+    def ay_g(self):
+        return self.accel_g[:, 1]
+
+    @property
+    def az_g(self):
+        return self.accel_g[:, 2]
+
+    @property
+    def gx_dps(self):
+        return self.gyro_dps[:, 0]
+
+    @property
+    def gy_dps(self):
+        return self.gyro_dps[:, 1]
+
+    @property
+    def gz_dps(self):
+        return self.gyro_dps[:, 2]
+
+    @cached_property
+    def accel_mag(self):
+        return np.sqrt(np.einsum('ij,ij->i', self.accel_g, self.accel_g))
+
+    @cached_property
+    def gyro_mag(self):
+        return np.sqrt(np.einsum('ij,ij->i', self.gyro_dps, self.gyro_dps))
+
+    def channels(self, names=('accel_mag', 'gyro_mag'), out=None):
+        """Named channels side by side as one (n, len(names)) float32 block.
+
+        The layout filter_design.filtfilt_channels() expects, e.g.
+        frame.channels(('ax_g', 'ay_g', 'az_g', 'gx_dps', 'gy_dps', 'gz_dps')).
+        Pass out to fill an existing buffer instead of allocating one.
+        """
+        if out is None:
+            out = np.empty((len(self), len(names)), dtype=np.float32)
+        for i, name in enumerate(names):
+            out[:, i] = getattr(self, name)
+        return out
+
+    def to_dataframe(self):
+        """Full DataFrame with the classic column names, for plotting / export only."""
+        df = pd.DataFrame(self.records)
+        for i, axis in enumerate(ACCEL_AXES):
+            df[axis + '_g'] = self.accel_g[:, i]
+        for i, axis in enumerate(GYRO_AXES):
+            df[axis + '_dps'] = self.gyro_dps[:, i]
+        df['accel_mag'] = self.accel_mag
+        df['gyro_mag'] = self.gyro_mag
+        return df
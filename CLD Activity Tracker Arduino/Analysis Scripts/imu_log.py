@@ -0,0 +1,88 @@
+import os
+
+import numpy as np
+
+# ---- 1. LogEntry layout, matching the ESP32 struct ----
+# 'L' = unsigned long (4 bytes), 'h' = signed int16 (2 bytes) -> 16 bytes per record
+log_dtype = np.dtype([
+    ('timestamp', '<u4'),  # 4-byte unsigned long (millis)
+    ('ax_raw', '<i2'),     # 2-byte signed int
+    ('ay_raw', '<i2'),
+    ('az_raw', '<i2'),
+    ('gx_raw', '<i2'),
+    ('gy_raw', '<i2'),
+    ('gz_raw', '<i2'),
+])
+RECORD_SIZE = log_dtype.itemsize
+
+DEFAULT_BLOCK_SIZE = 65536  # records per block (1 MiB of LogEntry data)
+
+
+# ---- 2. Memory-mapped reader ----
+class LogEntryReader:
+    """Lazy, zero-copy view over a LogEntry .bin capture.
+
+    The file is opened with np.memmap, so only the pages that are actually
+    indexed get read from disk. Slicing returns views into the map, never
+    copies. A trailing partial record (e.g. a capture cut off mid-write) is
+    ignored.
+    """
+
+    def __init__(self, filename):
+        self.filename = os.fspath(filename)
+        n_records = os.path.getsize(self.filename) // RECORD_SIZE
+        if n_records == 0:
+            # np.memmap refuses zero-length maps
+            self.records = np.empty(0, dtype=log_dtype)
+        else:
+            self.records = np.memmap(self.filename, dtype=log_dtype, mode='r',
+                                     shape=(n_records,))
+
+    def __len__(self):
+        return len(self.records)
+
+    def __getitem__(self, index):
+        return self.records[index]
+
+    @property
+    def timestamps(self):
+        return self.records['timestamp']
+
+    def window(self, start, stop):
+        """Records [start, stop) by sample index, as a view."""
+        start, stop, _ = slice(start, stop).indices(len(self))
+        return self.records[start:stop]
+
+    def time_range(self, t_start_ms, t_end_ms):
+        """Records with t_start_ms <= timestamp < t_end_ms, as a view.
+
+        Uses a binary search over the timestamp column, so only a handful of
+        pages are touched. Assumes the timestamps are non-decreasing.
+        """
+        ts = self.timestamps
+        start = int(np.searchsorted(ts, t_start_ms, side='left'))
+        stop = int(np.searchsorted(ts, t_end_ms, side='left'))
+        return self.records[start:stop]
+
+    def iter_blocks(self, block_size=DEFAULT_BLOCK_SIZE):
+        """Yield (start_index, records_view) in fixed-size blocks."""
+        for start in range(0, len(self), block_size):
+            yield start, self.records[start:start + block_size]
+
+    def close(self):
+        # Drop our reference; the map is released once no views remain
+        self.records = np.empty(0, dtype=log_dtype)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+
+def open_log(filename):
+    """Open a LogEntry .bin file and raise if it holds no samples."""
+    reader = LogEntryReader(filename)
+    if len(reader) == 0:
+        raise ValueError(f"No IMU data found in file: {filename}")
+    return reader
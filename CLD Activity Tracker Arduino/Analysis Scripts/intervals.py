@@ -0,0 +1,182 @@
+import numpy as np
+
+# Periods are (k, 2) integer arrays of (start, end) sample indices, in order;
+# `for start, end in periods` works as it did on the scripts' lists of tuples.
+
+
+def _periods(starts, ends):
+    return np.column_stack([np.asarray(starts, dtype=np.intp), np.asarray(ends, dtype=np.intp)])
+
+
+# ---- 1. Boolean mask -> periods ----
+def mask_periods(mask, include_leading=False, close_at_length=False):
+    """(start, end) of each run of True in mask, as the scripts' per-sample loops find them.
+
+    end is the first False sample after the run. The defaults follow the
+    edge loops of old_analysis.py and the track_movement scripts: a period
+    only starts on a False -> True edge, so a run already under way at
+    sample 0 is ignored, and a run still open at the end closes at
+    len(mask) - 1. binary_to_csv_pedometer.py's scan also counts a run
+    from sample 0 and closes an open one at len(mask):
+    include_leading=True, close_at_length=True.
+    """
+    mask = np.asarray(mask, dtype=bool)
+    n = len(mask)
+    if n == 0:
+        return _periods([], [])
+    edges = np.diff(mask.view(np.int8))
+    starts = np.flatnonzero(edges == 1) + 1
+    ends = np.flatnonzero(edges == -1) + 1
+    if mask[0]:
+        if include_leading:
+            starts = np.r_[0, starts]
+        else:
+            ends = ends[1:]  # the fall that ends the ignored leading run
+    if len(starts) > len(ends):
+        ends = np.r_[ends, n if close_at_length else n - 1]
+    return _periods(starts, ends)
+
+
+# ---- 2. Merge and filter ----
+def merge_close(periods, min_gap):
+    """Merge consecutive periods whose gap (next start - previous end) is <= min_gap."""
+    periods = np.asarray(periods, dtype=np.intp).reshape(-1, 2)
+    if len(periods) == 0:
+        return periods
+    breaks = np.flatnonzero(periods[1:, 0] - periods[:-1, 1] > min_gap) + 1
+    first = np.r_[0, breaks]
+    last = np.r_[breaks - 1, len(periods) - 1]
+    return _periods(periods[first, 0], periods[last, 1])
+
+
+def drop_short(periods, min_length, keep_end=None):
+    """Keep periods with end - start > min_length.
+
+    A period ending at keep_end is kept whatever its length
+    (binary_to_csv_pedometer.py never length-checked the run left open at
+    the end of the recording: pass keep_end=len(mask) to match).
+    """
+    periods = np.asarray(periods, dtype=np.intp).reshape(-1, 2)
+    keep = periods[:, 1] - periods[:, 0] > min_length
+    if keep_end is not None:
+        keep |= periods[:, 1] == keep_end
+    return periods[keep]
+
+
+def merge_overlapping(*period_lists):
+    """Union of several period lists (e.g. two devices): sorted, overlapping or touching ones joined."""
+    periods = np.concatenate([np.asarray(p, dtype=np.intp).reshape(-1, 2) for p in period_lists])
+    if len(periods) == 0:
+        return periods
+    periods = periods[np.argsort(periods[:, 0], kind='stable')]
+    reach = np.maximum.accumulate(periods[:, 1])  # furthest end so far
+    breaks = np.flatnonzero(periods[1:, 0] > reach[:-1]) + 1
+    first = np.r_[0, breaks]
+    last = np.r_[breaks - 1, len(periods) - 1]
+    return _periods(periods[first, 0], reach[last])
+
+
+# ---- 3. Inactivity ----
+def complement(periods, n):
+    """Inactivity periods between activity periods over n samples, as the scripts derive them.
+
+    Before the first period if it starts after 0, between consecutive
+    periods, and from the last end to n - 1. Empty if there is no activity.
+    """
+    periods = np.asarray(periods, dtype=np.intp).reshape(-1, 2)
+    if len(periods) == 0:
+        return periods
+    starts = periods[1:, 0]
+    ends = periods[:-1, 1]
+    if periods[0, 0] > 0:
+        starts, ends = np.r_[periods[0, 0], starts], np.r_[0, ends]
+    if periods[-1, 1] < n:
+        starts, ends = np.r_[starts, n - 1], np.r_[ends, periods[-1, 1]]
+    return _periods(ends, starts)
+
+
+# ---- 4. The same pipeline on a streamed mask ----
+class StreamingPeriods:
+    """mask_periods() -> merge_close() -> drop_short(), fed the mask chunk by chunk.
+
+    update() returns the periods that can no longer change: a period is
+    final once the stream has moved more than min_gap past its end without
+    a new one starting. flush() closes the stream and returns the rest.
+    Concatenated, they equal the batch functions on the whole mask. Memory
+    is a few integers, whatever the stream length.
+    """
+
+    def __init__(self, min_gap=None, min_length=None, include_leading=False, close_at_length=False):
+        self.min_gap = min_gap
+        self.min_length = min_length
+        self.include_leading = include_leading
+        self.close_at_length = close_at_length
+        self.reset()
+
+    def reset(self):
+        self.samples = 0
+        self._last = None     # last mask value seen
+        self._open = None     # start of the run in progress
+        self._pending = None  # (start, end) that a close successor could still extend
+
+    def _finish(self, start, end, out):
+        # A completed raw period: merge it into the pending one or retire the pending one
+        if self._pending is not None:
+            if self.min_gap is not None and start - self._pending[1] <= self.min_gap:
+                self._pending = (self._pending[0], end)
+                return
+            out.append(self._pending)
+        self._pending = (start, end)
+
+    def _release(self, out, horizon):
+        # No later period can start before horizon: retire the pending one if it is out of reach
+        if self._pending is not None and (self.min_gap is None or horizon - self._pending[1] > self.min_gap):
+            out.append(self._pending)
+            self._pending = None
+
+    def _result(self, out, keep_end=None):
+        periods = _periods([s for s, _ in out], [e for _, e in out])
+        return periods if self.min_length is None else drop_short(periods, self.min_length, keep_end)
+
+    def update(self, chunk):
+        chunk = np.asarray(chunk, dtype=bool)
+        if len(chunk) == 0:
+            return self._result([])
+        base = self.samples
+        if self._last is None:
+            if chunk[0] and self.include_leading:
+                self._open = 0
+            previous = chunk[0]  # sample 0 is never an edge
+        else:
+            previous = self._last
+        edges = np.diff(np.r_[previous, chunk].view(np.int8))
+        starts = (np.flatnonzero(edges == 1) + base).tolist()
+        ends = (np.flatnonzero(edges == -1) + base).tolist()
+
+        out = []
+        # Edges alternate; a fall with no run open ends an ignored leading run
+        if ends and (not starts or ends[0] < starts[0]):
+            if self._open is not None:
+                self._finish(self._open, ends[0], out)
+            self._open = None
+            ends = ends[1:]
+        for start, end in zip(starts, ends):
+            self._finish(start, end, out)
+        if len(starts) > len(ends):
+            self._open = starts[-1]
+
+        self.samples += len(chunk)
+        self._last = bool(chunk[-1])
+        self._release(out, self._open if self._open is not None else self.samples)
+        return self._result(out)
+
+    def flush(self):
+        out = []
+        end = None
+        if self._open is not None:
+            end = self.samples if self.close_at_length else self.samples - 1
+            self._finish(self._open, end, out)
+        self._release(out, np.inf)
+        result = self._result(out, keep_end=end if self.close_at_length else None)
+        self.reset()
+        return result
@@ -1,29 +1,19 @@
 import numpy as np
 import pandas as pd
 import matplotlib.pyplot as plt
-from scipy.signal import butter, filtfilt
 from scipy.ndimage import uniform_filter1d
 import os
+from filter_design import butter_bandpass_filter
+from zero_crossing import zero_crossing_rate
+from intervals import complement, mask_periods, merge_close
 
 # ---------------------------------------------
-# Bandpass filter
+# Bandpass filter: see filter_design.py
 # ---------------------------------------------
-def butter_bandpass_filter(data, lowcut, highcut, fs, order=4):
-    nyquist = 0.5 * fs
-    low = lowcut / nyquist
-    high = highcut / nyquist
-    if low <= 0 or high >= 1 or low >= high:
-        raise ValueError(f"Invalid cutoff frequencies: low={lowcut}, high={highcut}, fs={fs}")
-    b, a = butter(order, [low, high], btype='band')
-    return filtfilt(b, a, data)
 
 # ---------------------------------------------
-# Zero Crossing Rate
+# Zero Crossing Rate: see zero_crossing.py
 # ---------------------------------------------
-def zero_crossing_rate(data, window_size):
-    zero_crossings = np.diff(np.sign(data)) != 0
-    zcr = np.convolve(zero_crossings, np.ones(window_size), mode='same') / window_size
-    return zcr
 
 # ---------------------------------------------
 # Parameters
@@ -64,44 +54,12 @@ high_amp = accel_mag > amp_thresh
 zcr_threshold = np.percentile(zcr, 40)
 zcr_activity = zcr > zcr_threshold
 
-# Make sure both arrays are the same length before combining
-min_len = min(len(high_amp), len(zcr_activity))
-combined_activity = high_amp[:min_len] & zcr_activity[:min_len]
-
-# Identify activity periods
-activity_periods = []
-start = None
-for i in range(1, len(combined_activity)):
-    if combined_activity[i] and not combined_activity[i-1]:
-        start = i
-    elif not combined_activity[i] and combined_activity[i-1]:
-        if start is not None:
-            activity_periods.append((start, i))
-            start = None
-if start is not None:
-    activity_periods.append((start, len(combined_activity)-1))
-
-# Merge close activity periods
-merged_periods = []
-if activity_periods:
-    prev_start, prev_end = activity_periods[0]
-    for start, end in activity_periods[1:]:
-        if start - prev_end <= min_gap_samples:
-            prev_end = end
-        else:
-            merged_periods.append((prev_start, prev_end))
-            prev_start, prev_end = start, end
-    merged_periods.append((prev_start, prev_end))
-
-# Identify inactivity periods
-inactivity_periods = []
-if merged_periods:
-    if merged_periods[0][0] > 0:
-        inactivity_periods.append((0, merged_periods[0][0]))
-    for i in range(1, len(merged_periods)):
-        inactivity_periods.append((merged_periods[i-1][1], merged_periods[i][0]))
-    if merged_periods[-1][1] < len(combined_activity):
-        inactivity_periods.append((merged_periods[-1][1], len(combined_activity)-1))
+# zcr has one value per sample, so the masks line up
+combined_activity = high_amp & zcr_activity
+
+# Activity periods, close ones merged, and the inactivity between them
+merged_periods = merge_close(mask_periods(combined_activity), min_gap_samples)
+inactivity_periods = complement(merged_periods, len(combined_activity))
 
 # ---------------------------------------------
 # Print results
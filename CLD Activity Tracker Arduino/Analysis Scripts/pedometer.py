@@ -0,0 +1,92 @@
+from collections import namedtuple
+
+import numpy as np
+from scipy.signal import find_peaks
+
+from filter_design import butter_bandpass_filter
+from resample import canonical_frame, resample_frame, snapped_rate
+from runs import group_by_gap
+
+# ---- 1. Pedometer_Script.py defaults ----
+DEFAULT_PARAMS = {
+    'lowcut': 0.2,                # Hz
+    'highcut': 1.5,               # Hz
+    'order': 4,
+    'height_percentile': 90,      # 85 was used for 40 Hz data
+    'prominence_ratio': 0.5,      # prominence = height / 2
+    'distance_s': 1.0,            # at most one peak per second
+    'min_consecutive_steps': 3,   # must take this many steps in a row to count
+    'max_step_interval_s': 6,     # max time allowed between steps
+    'step_multiplier': 2,         # one peak per stride -> two steps
+}
+
+# step_count: confirmed peaks * step_multiplier
+# peaks:      indices of confirmed peaks (after gait confirmation)
+# candidates: indices of all find_peaks candidates
+# filtered:   band-passed signal the peaks were found on
+# active_s:   total time spanned by confirmed walking bouts
+StepResult = namedtuple('StepResult', ['step_count', 'peaks', 'candidates', 'filtered', 'active_s'])
+
+
+# ---- 2. Gait confirmation ----
+def gait_confirm(peaks, t, min_consecutive_steps, max_step_interval_s):
+    """Keep only peaks in runs of >= min_consecutive_steps with gaps <= max_step_interval_s.
+
+    Returns (confirmed_peaks, bounds) where bounds is an (n_runs, 2) array
+    of the first and last confirmed peak of each kept run.
+    """
+    peaks = np.asarray(peaks, dtype=np.intp)
+    runs = group_by_gap(t[peaks], max_step_interval_s, min_size=min_consecutive_steps)
+    confirmed = peaks[runs.members]
+    bounds = np.column_stack([confirmed[runs.starts], confirmed[runs.stops - 1]])
+    return confirmed, bounds
+
+
+# ---- 3. Full pipeline ----
+def count_steps(accel_mag, t, fs, height_threshold=None, **params):
+    """Pedometer_Script.py as a function: bandpass -> percentile height -> find_peaks -> gait confirmation.
+
+    height_threshold overrides the recording's own height_percentile, e.g. a
+    value read from a QuantileSketch fed chunk by chunk or pooled over
+    several captures (see quantile_sketch.py).
+    """
+    p = dict(DEFAULT_PARAMS, **params)
+    a_filt = butter_bandpass_filter(accel_mag, p['lowcut'], p['highcut'], fs, p['order'])
+    if height_threshold is None:
+        height_threshold = np.percentile(a_filt, p['height_percentile'])
+    candidates, _ = find_peaks(
+        a_filt,
+        height=height_threshold,
+        prominence=height_threshold * p['prominence_ratio'],
+        distance=max(int(p['distance_s'] * fs), 1),
+    )
+    final_peaks, bounds = gait_confirm(candidates, t, p['min_consecutive_steps'], p['max_step_interval_s'])
+    active_s = float(np.sum(t[bounds[:, 1]] - t[bounds[:, 0]]))
+    return StepResult(len(final_peaks) * p['step_multiplier'], final_peaks, candidates, a_filt, active_s)
+
+
+def count_steps_frame(frame, fs=None, resample=True, fs_out=None, **params):
+    """Run the pedometer on an ImuFrame; fs defaults to the rate measured from its timestamps.
+
+    With fs_out (e.g. resample.CANONICAL_FS) the uniform grid is brought to
+    that rate by polyphase resampling first, so every device is counted at
+    one rate with one filter design.
+
+    Returns (StepResult, t) where t is the time base (s) the peak indices refer to.
+    """
+    if fs is None:
+        if frame.timeline.dt_ms <= 0:
+            raise ValueError("No sample rate can be measured from these timestamps; pass fs")
+        fs = 1000.0 / frame.timeline.dt_ms
+    if resample and fs_out is not None:
+        resampled = canonical_frame(frame, fs, fs_out, channels=('accel_mag',))
+        fs = snapped_rate(fs, fs_out)
+        t = (resampled.t_ms - resampled.t_ms[0]) / 1000.0
+        accel_mag = resampled.values[:, 0]
+    elif resample:
+        resampled = resample_frame(frame, fs, channels=('accel_mag',))
+        t = (resampled.t_ms - resampled.t_ms[0]) / 1000.0
+        accel_mag = resampled.values[:, 0]
+    else:
+        t, accel_mag = frame.t, frame.accel_mag
+    return count_steps(accel_mag, t, fs, **params), t
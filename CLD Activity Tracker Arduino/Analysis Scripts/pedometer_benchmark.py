@@ -0,0 +1,212 @@
+import argparse
+import json
+import os
+import sys
+import time
+import warnings
+from collections import namedtuple
+from functools import partial
+
+import numpy as np
+import pandas as pd
+
+from capture_metadata import capture_metadata, load_frame, parse_capture_name
+from pedometer import count_steps
+from resample import CANONICAL_FS, resample_frame, resample_poly_uniform, snapped_rate
+from session_catalog import discover_captures
+from step_counter import StepCounter
+
+DEFAULT_ROOT = os.path.join(os.path.dirname(os.path.abspath(__file__)), '..')  # Pedometer Data + top-level captures
+DEFAULT_BASELINE = 'pedometer_baseline.json'
+BASELINE_VERSION = 2  # 2: samples/s is the median pass, not the best
+ACCURACY_TOLERANCE = 0.0     # MAPE points a variant may lose before it is flagged (counts are deterministic)
+THROUGHPUT_TOLERANCE = 0.25  # fraction of baseline samples/s a variant may lose (timing noise)
+MIN_TIMING_S = 1.0           # keep repeating timed passes until a variant has run this long
+# Throughput depends on the machine and its load, so by default it is only
+# reported; --strict-throughput makes a drop fail the comparison too
+
+# name:     filename, used as the key in the baseline
+# truth:    step count from the filename
+# fs:       rate measured from the timestamps
+# t:        time base (s) of accel_mag
+# accel_mag: on the uniform fs grid, as the scripts filter it
+Capture = namedtuple('Capture', ['name', 'truth', 'fs', 't', 'accel_mag'])
+
+
+# ---- 1. Labelled captures ----
+def load_labelled(roots=(DEFAULT_ROOT,)):
+    """Every capture under roots whose filename carries a step count, resampled like the scripts.
+
+    Captures too short to filter are skipped with a warning.
+    """
+    captures = []
+    for filename in discover_captures(roots):
+        truth = parse_capture_name(filename)['steps']
+        if truth is None:
+            continue
+        fs = capture_metadata(filename)['fs']
+        resampled = resample_frame(load_frame(filename), fs, channels=('accel_mag',))
+        accel_mag = resampled.values[:, 0]
+        if len(accel_mag) < 2 * fs:
+            warnings.warn(f"{os.path.basename(filename)}: too short to benchmark, skipped")
+            continue
+        t = (resampled.t_ms - resampled.t_ms[0]) / 1000.0
+        captures.append(Capture(os.path.basename(filename), truth, fs, t, accel_mag))
+    return captures
+
+
+# ---- 2. Pedometer variants ----
+def _offline(accel_mag, t, fs, **params):
+    return count_steps(accel_mag, t, fs, **params).step_count
+
+
+def _canonical(accel_mag, t, fs, fs_out=CANONICAL_FS, **params):
+    # Same pipeline after polyphase resampling to the canonical rate
+    resampled = resample_poly_uniform(accel_mag, fs, fs_out)
+    fs = snapped_rate(fs, fs_out)
+    return count_steps(resampled, t[0] + np.arange(len(resampled)) / fs, fs, **params).step_count
+
+
+def _streaming(accel_mag, t, fs, chunk_size=20):
+    counter = StepCounter(fs)
+    for i in range(0, len(accel_mag), chunk_size):
+        counter.update(accel_mag[i:i + chunk_size], t[i:i + chunk_size])
+    counter.flush()
+    return counter.step_count
+
+
+# Each takes (accel_mag, t, fs) and returns a step count
+VARIANTS = {
+    'Pedometer_Script': _offline,  # also pedometer_csv_current.py
+    'pedometer_csv': partial(_offline, height_percentile=85),
+    'Pedometer_Script_csv': partial(_offline, height_percentile=85, step_multiplier=1),
+    'step_counter': _streaming,    # live percentile, 20-sample notifications
+    'Pedometer_Script@40Hz': _canonical,  # every capture at CANONICAL_FS
+}
+
+
+# ---- 3. Accuracy and throughput ----
+def run_benchmark(captures, variants=VARIANTS, repeat=3):
+    """Count every capture with every variant.
+
+    Returns (counts, summary): counts has one row per capture (truth and
+    each variant's count); summary one row per variant with mean absolute
+    error (steps), MAPE (%) and samples/s. Throughput is over the counting
+    only -- loading and resampling are shared by all variants. The counting
+    pass doubles as a warm-up (filter designs are cached), then the median
+    of at least `repeat` timed passes over all captures is kept, repeating
+    until MIN_TIMING_S has gone by so fast variants are not timed on noise.
+    A median, unlike a best pass, is not set by one lucky run.
+    """
+    counts = pd.DataFrame({'capture': [c.name for c in captures],
+                           'fs': [c.fs for c in captures],
+                           'truth': [c.truth for c in captures]})
+    total_samples = sum(len(c.accel_mag) for c in captures)
+    rows = []
+    for name, func in variants.items():
+        found = [func(c.accel_mag, c.t, c.fs) for c in captures]
+        passes = []
+        while len(passes) < repeat or sum(passes) < MIN_TIMING_S:
+            start = time.perf_counter()
+            for c in captures:
+                func(c.accel_mag, c.t, c.fs)
+            passes.append(time.perf_counter() - start)
+        seconds = float(np.median(passes))
+        counts[name] = found
+        error = np.abs(np.asarray(found) - counts['truth'].to_numpy())
+        rows.append({
+            'variant': name,
+            'mean_abs_error': float(error.mean()),
+            'mape': float(np.mean(error / counts['truth'].to_numpy()) * 100),
+            'samples_per_s': total_samples / seconds,
+        })
+    return counts, pd.DataFrame(rows)
+
+
+# ---- 4. Baseline ----
+def save_baseline(counts, summary, path=DEFAULT_BASELINE):
+    variants = {}
+    for row in summary.to_dict('records'):
+        name = row.pop('variant')
+        row['counts'] = {c: int(n) for c, n in zip(counts['capture'], counts[name])}
+        variants[name] = row
+    with open(path, 'w') as f:
+        json.dump({'version': BASELINE_VERSION, 'variants': variants}, f, indent=2)
+
+
+def load_baseline(path=DEFAULT_BASELINE):
+    with open(path) as f:
+        baseline = json.load(f)
+    if baseline.get('version') != BASELINE_VERSION:
+        raise ValueError(f"{path}: baseline version {baseline.get('version')}, expected {BASELINE_VERSION}")
+    return baseline
+
+
+def compare(counts, summary, baseline, accuracy_tolerance=ACCURACY_TOLERANCE,
+            throughput_tolerance=THROUGHPUT_TOLERANCE):
+    """Changes against a baseline, as (regressions, slowdowns) lists of messages.
+
+    A variant regresses if its MAPE rises by more than accuracy_tolerance
+    points; per-capture count changes are listed with it so it can be
+    traced. Counts are deterministic, timings are not: a samples/s drop of
+    more than throughput_tolerance of the baseline is a slowdown, which the
+    caller decides whether to fail on. Variants missing from the baseline
+    are not judged.
+    """
+    problems, slowdowns = [], []
+    for row in summary.to_dict('records'):
+        old = baseline['variants'].get(row['variant'])
+        if old is None:
+            continue
+        name = row['variant']
+        if row['mape'] > old['mape'] + accuracy_tolerance:
+            changed = [f"{c} {old['counts'][c]}->{n}" for c, n in zip(counts['capture'], counts[name])
+                       if c in old['counts'] and old['counts'][c] != n]
+            problems.append(f"{name}: MAPE {old['mape']:.1f}% -> {row['mape']:.1f}%"
+                            + (f" ({', '.join(changed)})" if changed else ''))
+        if row['samples_per_s'] < old['samples_per_s'] * (1 - throughput_tolerance):
+            slowdowns.append(f"{name}: {old['samples_per_s']:,.0f} -> {row['samples_per_s']:,.0f} samples/s")
+    return problems, slowdowns
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description="Step-count accuracy and throughput of every pedometer variant "
+                                                 "over the captures labelled with their true step count.")
+    parser.add_argument('roots', nargs='*', default=[DEFAULT_ROOT], help="directories to scan")
+    parser.add_argument('--baseline', default=DEFAULT_BASELINE)
+    parser.add_argument('--save-baseline', action='store_true', help="write the results as the new baseline")
+    parser.add_argument('--variants', nargs='+', choices=list(VARIANTS), default=list(VARIANTS))
+    parser.add_argument('--repeat', type=int, default=3)
+    parser.add_argument('--accuracy-tolerance', type=float, default=ACCURACY_TOLERANCE)
+    parser.add_argument('--throughput-tolerance', type=float, default=THROUGHPUT_TOLERANCE)
+    parser.add_argument('--strict-throughput', action='store_true',
+                        help="fail on a throughput drop too, not only on an accuracy regression")
+    args = parser.parse_args()
+
+    captures = load_labelled(args.roots)
+    if not captures:
+        sys.exit(f"No labelled captures under {', '.join(args.roots)}")
+    counts, summary = run_benchmark(captures, {name: VARIANTS[name] for name in args.variants}, args.repeat)
+    print(counts.to_string(index=False))
+    print()
+    print(summary.to_string(index=False, formatters={'mean_abs_error': '{:.1f}'.format, 'mape': '{:.1f}%'.format,
+                                                     'samples_per_s': '{:,.0f}'.format}))
+
+    if args.save_baseline:
+        save_baseline(counts, summary, args.baseline)
+        print(f"\nBaseline saved to {args.baseline}")
+    elif os.path.exists(args.baseline):
+        problems, slowdowns = compare(counts, summary, load_baseline(args.baseline),
+                                      args.accuracy_tolerance, args.throughput_tolerance)
+        if args.strict_throughput:
+            problems, slowdowns = problems + slowdowns, []
+        print(f"\nAgainst {args.baseline}: " + ('no regressions' if not problems else 'REGRESSIONS'))
+        for problem in problems:
+            print(f"  {problem}")
+        if slowdowns:
+            print("Slower than the baseline (not failing; timings vary between runs, see --strict-throughput):")
+            for slowdown in slowdowns:
+                print(f"  {slowdown}")
+        sys.exit(1 if problems else 0)
+    else:
+        print(f"\nNo baseline at {args.baseline}; run with --save-baseline to create one")
@@ -1,38 +1,40 @@
 import numpy as np
 import pandas as pd
-from scipy.signal import butter, filtfilt, find_peaks
+from scipy.signal import find_peaks
 import matplotlib.pyplot as plt
+from firmware_csv import read_export_frame
+from resample import resample_frame
+from capture_metadata import capture_metadata
+from filter_design import bandpass_channels
+from pedometer import gait_confirm
 
-# ---- 1. Filtering function ----
-def butter_bandpass_filter(data, lowcut, highcut, fs, order=4):
-    nyq = 0.5 * fs
-    low, high = lowcut / nyq, highcut / nyq
-    b, a = butter(order, [low, high], btype='band')
-    return filtfilt(b, a, data)
+# ---- 1. Filtering function: see filter_design.py ----
 
 # ---- 2. Load IMU CSV data ----
 filename_csv = '/Users/annalee/Documents/BME390/testing files/test_bluetooth_11_18.csv'
-df = pd.read_csv(filename_csv)
+# Strips the firmware banners, detects the 7/9-column layout and units, parses in chunks
+frame = read_export_frame(filename_csv)
 
-print(df.head())
+print(frame[:5].to_dataframe())
 
 # ---- 3. Convert raw sensor data to physical units ----
-df["ax_g"] = df["ax"] / 16384.0
-df["ay_g"] = df["ay"] / 16384.0
-df["az_g"] = df["az"] / 16384.0
-
-df["gx_dps"] = df["gx"] / 131.0
-df["gy_dps"] = df["gy"] / 131.0
-df["gz_dps"] = df["gz"] / 131.0
-
+# ImuFrame derives ax_g…gz_dps lazily in float32 on first access
 # ---- 4. Compute magnitudes ----
-df["accel_mag"] = np.sqrt(df["ax_g"]**2 + df["ay_g"]**2 + df["az_g"]**2)
-df["gyro_mag"]  = np.sqrt(df["gx_dps"]**2 + df["gy_dps"]**2 + df["gz_dps"]**2)
-accel_mag = df["accel_mag"]
+# frame.accel_mag / frame.gyro_mag, taken below with or without resampling
 
 # ---- 5. Prepare time base ----
-fs = 40  # Hz — adjust to your actual sampling rate
-t = (df["timestamp"] - df["timestamp"].iloc[0]) / 1000  # convert ms → s
+# Hz — measured from the timestamps and cross-checked against the filename
+fs = capture_metadata(filename_csv)['fs']
+t = frame.t  # seconds since first sample
+
+# Put the jittered firmware timestamps onto an exact fs grid before filtering
+RESAMPLE = True
+if RESAMPLE:
+    resampled = resample_frame(frame, fs)
+    t = (resampled.t_ms - resampled.t_ms[0]) / 1000.0
+    accel_mag, gyro_mag = resampled.values.T
+else:
+    accel_mag, gyro_mag = frame.accel_mag, frame.gyro_mag
 print(t)
 
 plt.figure(figsize=(12, 6))
@@ -46,9 +48,8 @@ plt.grid(alpha=0.3)
 plt.tight_layout()
 plt.show()
 
-# ---- 6. Filter both signals ----
-a_filt = butter_bandpass_filter(df["accel_mag"], 0.2, 1.5, fs)
-g_filt = butter_bandpass_filter(df["gyro_mag"], 0.2, 1.5, fs)
+# ---- 6. Filter both signals (one float32 pass over both channels) ----
+a_filt, g_filt = bandpass_channels(np.column_stack((accel_mag, gyro_mag)), 0.2, 1.5, fs).T
 
 # ---- 7. Combine into unified "activity index" ----
 activity_index = 0.7 * a_filt + 0.3 * (g_filt / np.max(g_filt)) * np.mean(a_filt)
@@ -71,23 +72,9 @@ print(f"Detected {len(peaks)} candidate motion peaks")
 MIN_CONSECUTIVE_STEPS = 3
 MAX_STEP_INTERVAL_S = 6
 
-final_peaks = []
-
-if len(peaks) > 0:
-    peak_times = t.iloc[peaks].values
-    time_diffs = np.diff(peak_times)
-    current_group = [peaks[0]]
-    
-    for i in range(len(time_diffs)):
-        if time_diffs[i] <= MAX_STEP_INTERVAL_S:
-            current_group.append(peaks[i+1])
-        else:
-            if len(current_group) >= MIN_CONSECUTIVE_STEPS:
-                final_peaks.extend(current_group)
-            current_group = [peaks[i+1]]
-    
-    if len(current_group) >= MIN_CONSECUTIVE_STEPS:
-        final_peaks.extend(current_group)
+# Split the candidates wherever the gap exceeds MAX_STEP_INTERVAL_S and keep runs
+# of at least MIN_CONSECUTIVE_STEPS peaks (see gait_confirm in pedometer.py)
+final_peaks, walk_bounds = gait_confirm(peaks, t, MIN_CONSECUTIVE_STEPS, MAX_STEP_INTERVAL_S)
 
 step_count = len(final_peaks) * 2
 print(f"✅ Detected {step_count} steps (after gait confirmation)")
@@ -1,68 +1,50 @@
 import numpy as np
 import pandas as pd
-from scipy.signal import butter, filtfilt, find_peaks
+from scipy.signal import find_peaks
 import matplotlib.pyplot as plt
+from firmware_csv import read_export_frame
+from resample import resample_frame
+from capture_metadata import capture_metadata
+from filter_design import butter_bandpass_filter
+from pedometer import gait_confirm
 
-# ---- 1. Filtering function ----
-def butter_bandpass_filter(data, lowcut, highcut, fs, order=4):
-    nyq = 0.5 * fs
-    low, high = lowcut / nyq, highcut / nyq
-    b, a = butter(order, [low, high], btype='band')
-    return filtfilt(b, a, data)
-
-# ---- 2. Load IMU binary data ----
-log_dtype = np.dtype([
-    ('timestamp', np.uint32),
-    ('ax_raw', np.int16),
-    ('ay_raw', np.int16),
-    ('az_raw', np.int16),
-    ('gx_raw', np.int16),
-    ('gy_raw', np.int16),
-    ('gz_raw', np.int16),
-])
+# ---- 1. Filtering function: see filter_design.py ----
 
 # ---- 2. Load IMU CSV data ----
 filename_csv = '/Users/annalee/Documents/BME390/testing files/test_bluetooth_11_18.csv'
-data = pd.read_csv(filename_csv)
+# Strips the firmware banners, detects the 7/9-column layout and units, parses in chunks
+frame = read_export_frame(filename_csv)
 
-if len(data) == 0:
+if len(frame) == 0:
     raise ValueError("No IMU data found in file.")
 
-# Convert to DataFrame for convenience
-df = pd.DataFrame(data)
-print(df.head())
-
-# --- ADD THIS SNIPPET TO FIX ROLLOVER ---
-# Find large negative jumps in the timestamp, which indicate a rollover
-diffs = np.diff(df["timestamp"].astype(np.int64))
-rollover_indices = np.where(diffs < -100000)[0]  # Find jumps > 1ook ms
-print(rollover_indices)
-if len(rollover_indices) > 0:
-    first_rollover = rollover_indices[0]
-    print(f"WARNING: Timestamp rollover detected at index {first_rollover}.")
-    print(f"Truncating data to only use the first {first_rollover} samples.")
-    df = df.iloc[:first_rollover] # Keep only the data BEFORE the rollover
-# --- END SNIPPET ---
+print(frame[:5].to_dataframe())
 
-# ---- 3. Convert raw sensor data to physical units ----
-df["ax_g"] = df["ax"] / 16384.0
-df["ay_g"] = df["ay"] / 16384.0
-df["az_g"] = df["az"] / 16384.0
-
-df["gx_dps"] = df["gx"] / 131.0
-df["gy_dps"] = df["gy"] / 131.0
-df["gz_dps"] = df["gz"] / 131.0
+# --- Timestamp rollover / reset handling ---
+# frame.t is unwrapped into one monotonic timeline (see timestamps.py), so no
+# samples are thrown away; firmware resets and logging pauses are only reported
+for brk in frame.timeline.breaks:
+    print(f"WARNING: Timestamp {brk['kind']} at index {brk['index']} (jump of {brk['gap_ms']} ms).")
+print(f"{len(frame.timeline.segments)} contiguous segment(s)")
 
+# ---- 3. Convert raw sensor data to physical units ----
+# ImuFrame derives ax_g…gz_dps lazily in float32 on first access
 # ---- 4. Compute magnitudes ----
-df["accel_mag"] = np.sqrt(df["ax_g"]**2 + df["ay_g"]**2 + df["az_g"]**2)
-df["gyro_mag"]  = np.sqrt(df["gx_dps"]**2 + df["gy_dps"]**2 + df["gz_dps"]**2)
-accel_mag = df["accel_mag"]
+# frame.accel_mag / frame.gyro_mag, taken below with or without resampling
 
 # ---- 5. Prepare time base ----
-fs = 20 
-# fs = 40  
-# Hz — adjust to your actual sampling rate
-t = (df["timestamp"] - df["timestamp"].iloc[0]) / 1000 # convert ms → s
+# Hz — measured from the timestamps and cross-checked against the filename
+fs = capture_metadata(filename_csv)['fs']
+t = frame.t  # seconds since first sample
+
+# Put the jittered firmware timestamps onto an exact fs grid before filtering
+RESAMPLE = True
+if RESAMPLE:
+    resampled = resample_frame(frame, fs)
+    t = (resampled.t_ms - resampled.t_ms[0]) / 1000.0
+    accel_mag, gyro_mag = resampled.values.T
+else:
+    accel_mag, gyro_mag = frame.accel_mag, frame.gyro_mag
 print(t)
 
 plt.figure(figsize=(12, 6))
@@ -79,8 +61,8 @@ plt.show()
 
 
 # ---- 6. Filter both signals ----
-a_filt = butter_bandpass_filter(df["accel_mag"], 0.2, 1.5, fs)
-g_filt = butter_bandpass_filter(df["gyro_mag"], 0.2, 1.5, fs)
+a_filt = butter_bandpass_filter(accel_mag, 0.2, 1.5, fs)
+g_filt = butter_bandpass_filter(gyro_mag, 0.2, 1.5, fs)
 
 # ---- 7. Combine into unified "activity index" ----
 # activity_index = 0.7 * a_filt + 0.3 * (g_filt / np.max(g_filt)) * np.mean(a_filt)
@@ -108,35 +90,9 @@ print(f"Detected {len(peaks)} candidate motion peaks")
 MIN_CONSECUTIVE_STEPS = 3  # Must take this many steps in a row to count
 MAX_STEP_INTERVAL_S = 6  # Max time allowed between steps (in seconds)
 
-final_peaks = [] # This will store the *indices* of confirmed steps
-
-if len(peaks) > 0:
-    # Get the times of all candidate peaks
-    peak_times = t.iloc[peaks].values
-    
-    # Calculate time difference between consecutive peaks
-    time_diffs = np.diff(peak_times)
-    
-    # 'current_group' will store the indices of peaks in a potential walk
-    current_group = [peaks[0]] 
-    
-    for i in range(len(time_diffs)):
-        # Check if the time gap is small enough to be part of the same walk
-        if time_diffs[i] <= MAX_STEP_INTERVAL_S:
-            # This step is part of the current group
-            current_group.append(peaks[i+1])
-        else:
-            # This step is too far. The group is broken.
-            # Check if the group we *just* finished is valid.
-            if len(current_group) >= MIN_CONSECUTIVE_STEPS:
-                final_peaks.extend(current_group) # Add them to the final list
-            
-            # Start a new group with the current peak
-            current_group = [peaks[i+1]]
-    
-    # At the end of the loop, check the very last group
-    if len(current_group) >= MIN_CONSECUTIVE_STEPS:
-        final_peaks.extend(current_group)
+# Split the candidates wherever the gap exceeds MAX_STEP_INTERVAL_S and keep runs
+# of at least MIN_CONSECUTIVE_STEPS peaks (see gait_confirm in pedometer.py)
+final_peaks, walk_bounds = gait_confirm(peaks, t, MIN_CONSECUTIVE_STEPS, MAX_STEP_INTERVAL_S)
 
 # The step_count is the total number of peaks in all valid groups
 step_count = len(final_peaks)*2
@@ -0,0 +1,155 @@
+import argparse
+import itertools
+import sys
+
+import numpy as np
+import pandas as pd
+from scipy.signal import find_peaks, peak_prominences
+
+from batch_runner import run_batch
+from filter_design import butter_bandpass_filter
+from pedometer import DEFAULT_PARAMS
+from pedometer_benchmark import DEFAULT_ROOT, load_labelled
+from runs import split_on_gaps
+
+# The pipeline's knobs by stage; each stage is computed once and reused by every combination of the later ones
+FILTER_KEYS = ('lowcut', 'highcut', 'order')
+PEAK_KEYS = ('height_percentile', 'prominence_ratio', 'distance_s')
+GAIT_KEYS = ('min_consecutive_steps', 'max_step_interval_s')
+COUNT_KEYS = ('step_multiplier',)
+SWEEP_KEYS = FILTER_KEYS + PEAK_KEYS + GAIT_KEYS + COUNT_KEYS
+
+# Around the hand-tuned values; highcut stays below the 4 Hz capture's 2 Hz Nyquist limit
+DEFAULT_GRID = {
+    'lowcut': [0.1, 0.2, 0.3],
+    'highcut': [1.2, 1.5, 1.8],
+    'height_percentile': [80, 85, 90, 95],
+    'prominence_ratio': [0.25, 0.5, 0.75],
+    'distance_s': [0.3, 0.5, 0.75, 1.0],
+    'min_consecutive_steps': [2, 3, 4],
+    'max_step_interval_s': [2, 4, 6],
+    'step_multiplier': [1, 2],
+}
+
+
+def full_grid(grid):
+    """grid with every knob present: missing ones take the DEFAULT_PARAMS value."""
+    return {key: np.atleast_1d(grid.get(key, DEFAULT_PARAMS[key])).tolist() for key in SWEEP_KEYS}
+
+
+# ---- 1. Everything downstream of one filtered signal ----
+def confirmed_counts(filtered, t, fs, grid):
+    """Confirmed peaks for every PEAK_KEYS x GAIT_KEYS combination, shaped in that key order.
+
+    Same counts as find_peaks + gait_confirm per combination, but:
+    - per distance, find_peaks runs once at the lowest height. The distance
+      rule only lets taller peaks suppress a peak, so the peaks above any
+      higher threshold are that set's members above it; prominences depend
+      only on the signal, so they are computed once per candidate and each
+      (height, prominence) pair is a mask.
+    - per max_step_interval_s, the runs are split once; every
+      min_consecutive_steps is then a sum over the run lengths.
+    """
+    heights = np.percentile(filtered, grid['height_percentile'])
+    ratios = np.asarray(grid['prominence_ratio'], dtype=np.float64)
+    min_steps = np.asarray(grid['min_consecutive_steps'])
+    counts = np.zeros((len(heights), len(ratios), len(grid['distance_s']),
+                       len(min_steps), len(grid['max_step_interval_s'])), dtype=np.intp)
+    for k, distance_s in enumerate(grid['distance_s']):
+        candidates, _ = find_peaks(filtered, height=heights.min(), distance=max(int(distance_s * fs), 1))
+        prominences = peak_prominences(filtered, candidates)[0]
+        for i, height in enumerate(heights):
+            tall = filtered[candidates] >= height
+            for j, ratio in enumerate(ratios):
+                peak_t = t[candidates[tall & (prominences >= height * ratio)]]
+                for b, max_gap in enumerate(grid['max_step_interval_s']):
+                    starts, stops = split_on_gaps(peak_t, max_gap)
+                    sizes = stops - starts
+                    counts[i, j, k, :, b] = (sizes[None, :] >= min_steps[:, None]) @ sizes
+    return counts
+
+
+def _sweep_task(item, shared):
+    # One (capture, band): filter once, then the whole downstream grid
+    captures, grid = shared
+    index, (lowcut, highcut, order) = item
+    c = captures[index]
+    filtered = butter_bandpass_filter(c.accel_mag, lowcut, highcut, c.fs, order)
+    return {'counts': confirmed_counts(filtered, c.t, c.fs, grid).ravel()}
+
+
+# ---- 2. Sweep and rank ----
+def sweep(captures, grid=DEFAULT_GRID, workers=None):
+    """Step-count error of every parameter combination over the labelled captures, best first.
+
+    One task per (capture, band) is spread over a process pool
+    (batch_runner.run_batch); the captures and grid go to each worker once.
+    A band a capture cannot be filtered with (e.g. highcut above its
+    Nyquist rate) fails every combination using it; those rows keep NaN
+    errors and sort last. Returns one row per combination: the knobs,
+    mape (%), mean_abs_error and max_abs_error (steps).
+    """
+    grid = full_grid(grid)
+    bands = list(itertools.product(*(grid[key] for key in FILTER_KEYS)))
+    items = [(i, band) for band in bands for i in range(len(captures))]
+    batch = run_batch(_sweep_task, items, workers=workers, shared=(captures, grid))
+
+    n_down = int(np.prod([len(grid[key]) for key in PEAK_KEYS + GAIT_KEYS]))
+    confirmed = np.full((len(bands), len(captures), n_down), np.nan)
+    for (i, band), row in zip(items, batch.summary.to_dict('records')):
+        if row['error']:
+            print(f"{captures[i].name} {band}: {row['error']}", file=sys.stderr)
+        else:
+            confirmed[bands.index(band), i] = row['counts']
+
+    # (band, capture, downstream, multiplier) -> per-combination errors over the captures
+    truth = np.array([c.truth for c in captures], dtype=np.float64)
+    steps = confirmed[..., None] * np.asarray(grid['step_multiplier'])
+    error = np.abs(steps - truth[None, :, None, None])
+    table = pd.MultiIndex.from_product([grid[key] for key in SWEEP_KEYS], names=SWEEP_KEYS).to_frame(index=False)
+    table['mape'] = (error / truth[None, :, None, None]).mean(axis=1).ravel() * 100
+    table['mean_abs_error'] = error.mean(axis=1).ravel()
+    table['max_abs_error'] = error.max(axis=1).ravel()
+    return table.sort_values(['mape', 'mean_abs_error'], kind='stable', na_position='last').reset_index(drop=True)
+
+
+def _parse_grid(options):
+    # --set key=v1,v2,... overrides one knob of DEFAULT_GRID
+    grid = dict(DEFAULT_GRID)
+    for option in options:
+        key, _, values = option.partition('=')
+        if key not in SWEEP_KEYS:
+            raise ValueError(f"Unknown knob {key!r}; expected one of {SWEEP_KEYS}")
+        grid[key] = [float(v) if '.' in v else int(v) for v in values.split(',')]
+    return grid
+
+
+if __name__ == '__main__':
+    import time
+
+    parser = argparse.ArgumentParser(description="Rank pedometer parameter combinations by step-count error "
+                                                 "over the captures labelled with their true step count.")
+    parser.add_argument('roots', nargs='*', default=[DEFAULT_ROOT], help="directories to scan")
+    parser.add_argument('--set', action='append', default=[], metavar='KNOB=V1,V2',
+                        help=f"values to try for one knob ({', '.join(SWEEP_KEYS)})")
+    parser.add_argument('--workers', type=int, default=None)
+    parser.add_argument('--top', type=int, default=20)
+    parser.add_argument('--out', help="save the full ranked table as CSV")
+    args = parser.parse_args()
+
+    grid = _parse_grid(args.set)
+    captures = load_labelled(args.roots)
+    start = time.perf_counter()
+    table = sweep(captures, grid, args.workers)
+    elapsed = time.perf_counter() - start
+
+    print(f"{len(table)} combinations x {len(captures)} captures in {elapsed:.1f} s")
+    print(table.head(args.top).to_string(formatters={'mape': '{:.1f}%'.format, 'mean_abs_error': '{:.1f}'.format}))
+    defaults = np.ones(len(table), dtype=bool)
+    for key in SWEEP_KEYS:
+        defaults &= np.isclose(table[key].to_numpy(dtype=np.float64), DEFAULT_PARAMS[key])
+    if defaults.any():
+        rank = int(np.flatnonzero(defaults)[0])
+        print(f"Pedometer_Script.py defaults: rank {rank + 1}, MAPE {table['mape'][rank]:.1f}%")
+    if args.out:
+        table.to_csv(args.out, index=False)
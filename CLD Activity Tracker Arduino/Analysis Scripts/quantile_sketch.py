@@ -0,0 +1,162 @@
+import sys
+
+import numpy as np
+
+DEFAULT_COMPRESSION = 200  # t-digest delta: ~delta/2 centroids kept, rank error ~pi/delta at the median
+BUFFER_FACTOR = 5          # samples buffered per unit of compression before a merge pass
+
+
+# ---- 1. Mergeable t-digest ----
+def _scale(q, compression):
+    # t-digest k1 scale: centroids are small near q = 0 and 1 and large around the median
+    return compression / (2 * np.pi) * np.arcsin(2 * np.clip(q, 0.0, 1.0) - 1)
+
+
+class QuantileSketch:
+    """Streaming percentiles in bounded memory (a merging t-digest).
+
+    update() takes samples in chunks of any size; percentile() can be asked
+    at any time and follows np.percentile's linear interpolation. Samples
+    are buffered and clustered into about compression / 2 centroids once
+    there are more than BUFFER_FACTOR * compression points, so memory stays
+    bounded whatever the stream length.
+
+    Sketches merge: build one per chunk, file or worker process and combine
+    them with merge(); the result has the same error bound as one sketch fed
+    everything. Up to BUFFER_FACTOR * compression samples the answers are
+    exact; after that the rank of the returned value is within
+    rank_error(q) of q, and min and max stay exact.
+    """
+
+    def __init__(self, compression=DEFAULT_COMPRESSION):
+        self.compression = compression
+        self.means = np.empty(0)
+        self.weights = np.empty(0)
+        self.min = np.inf
+        self.max = -np.inf
+        self._buffer = []   # (values, weights) pairs not yet merged into the centroids
+        self._buffered = 0
+
+    @property
+    def count(self):
+        return int(self.weights.sum()) + self._buffered
+
+    def update(self, values):
+        """Add samples (any array-like; NaNs are ignored)."""
+        values = np.asarray(values, dtype=np.float64).ravel()
+        values = values[~np.isnan(values)]
+        if len(values) == 0:
+            return self
+        self.min = min(self.min, float(values.min()))
+        self.max = max(self.max, float(values.max()))
+        self._buffer.append((values, np.ones(len(values))))
+        self._buffered += len(values)
+        if self._buffered >= BUFFER_FACTOR * self.compression:
+            self._compress()
+        return self
+
+    def merge(self, other):
+        """Fold another sketch into this one (e.g. from another chunk or worker)."""
+        other._compress()
+        if len(other.means):
+            self._buffer.append((other.means, other.weights))
+            self._buffered += len(other.means)
+            self.min = min(self.min, other.min)
+            self.max = max(self.max, other.max)
+            self._compress()
+        return self
+
+    def _compress(self):
+        if not self._buffer:
+            return
+        means = np.concatenate([self.means] + [v for v, _ in self._buffer])
+        weights = np.concatenate([self.weights] + [w for _, w in self._buffer])
+        self._buffer, self._buffered = [], 0
+
+        order = np.argsort(means, kind='stable')
+        means, weights = means[order], weights[order]
+        total = weights.sum()
+        if len(means) > BUFFER_FACTOR * self.compression:
+            # Points whose cumulative rank falls in the same unit of k share a centroid,
+            # so no centroid spans more than one unit of the scale function
+            centre = (np.cumsum(weights) - weights / 2) / total
+            cell = np.floor(_scale(centre, self.compression)).astype(np.int64)
+            starts = np.flatnonzero(np.r_[True, cell[1:] != cell[:-1]])
+            weights_sum = np.add.reduceat(weights, starts)
+            means = np.add.reduceat(means * weights, starts) / weights_sum
+            weights = weights_sum
+        self.means, self.weights = means, weights
+
+    # ---- 2. Queries ----
+    def percentile(self, p):
+        """Like np.percentile(samples_so_far, p) (linear interpolation); p may be an array."""
+        self._compress()
+        if len(self.means) == 0:
+            raise ValueError("percentile of an empty sketch")
+        q = np.asarray(p, dtype=np.float64) / 100.0
+        if np.any((q < 0) | (q > 1)):
+            raise ValueError("Percentiles must be in the range [0, 100]")
+        # A centroid of weight w covering ranks r .. r + w - 1 sits at its middle rank;
+        # with all weights 1 this is exactly np.percentile's interpolation
+        rank = np.cumsum(self.weights) - (self.weights + 1) / 2
+        total = self.weights.sum()
+        positions = np.r_[0.0, rank, total - 1]
+        values = np.r_[self.min, self.means, self.max]
+        result = np.interp(q * (total - 1), positions, values)
+        return float(result) if result.ndim == 0 else result
+
+    def quantile(self, q):
+        return self.percentile(np.asarray(q) * 100.0)
+
+    def rank_error(self, q):
+        """Bound on |rank(returned value) / count - q| once the sketch has compressed.
+
+        One centroid covers at most one unit of the scale function, i.e.
+        2 * pi * sqrt(q (1 - q)) / compression of the ranks; interpolating
+        inside it is off by at most that much.
+        """
+        q = np.asarray(q, dtype=np.float64)
+        return 2 * np.pi * np.sqrt(q * (1 - q)) / self.compression
+
+    def __len__(self):
+        return self.count
+
+
+def sketch_percentile(chunks, p, compression=DEFAULT_COMPRESSION):
+    """np.percentile over an iterable of chunks without holding them all in memory."""
+    sketch = QuantileSketch(compression)
+    for chunk in chunks:
+        sketch.update(chunk)
+    return sketch.percentile(p)
+
+
+# ---- 3. Check against np.percentile on a capture ----
+if __name__ == '__main__':
+    from capture_metadata import capture_metadata, load_frame
+    from filter_design import butter_bandpass_filter
+
+    filename = sys.argv[1]
+    chunk_size = int(sys.argv[2]) if len(sys.argv) > 2 else 20
+    fs = capture_metadata(filename)['fs']
+    signal = butter_bandpass_filter(load_frame(filename).accel_mag, 0.2, 1.5, fs)
+    ranked = np.sort(signal)
+
+    sketches = [QuantileSketch().update(signal[i:i + chunk_size]) for i in range(0, len(signal), chunk_size)]
+    merged = QuantileSketch()
+    for sketch in sketches:
+        merged.merge(sketch)
+    streamed = QuantileSketch()
+    for i in range(0, len(signal), chunk_size):
+        streamed.update(signal[i:i + chunk_size])
+
+    print(f"{len(signal)} samples in chunks of {chunk_size}; centroids: "
+          f"streamed {len(streamed.means)}, merged from {len(sketches)} sketches {len(merged.means)}")
+    for p in (5, 40, 50, 85, 90, 95):
+        exact = np.percentile(signal, p)
+        report = []
+        for name, sketch in (('streamed', streamed), ('merged', merged)):
+            estimate = sketch.percentile(p)
+            rank = np.searchsorted(ranked, estimate) / len(signal)
+            report.append(f"{name} {estimate:+.5f} (rank off by {abs(rank - p / 100):.4f})")
+        print(f"  p{p}: exact {exact:+.5f}, " + ", ".join(report) +
+              f"; bound {streamed.rank_error(p / 100):.4f}")
@@ -0,0 +1,213 @@
+from collections import namedtuple
+from fractions import Fraction
+from functools import lru_cache
+
+import numpy as np
+from scipy.signal import firwin
+
+from filter_design import FILTER_CACHE_SIZE
+
+DEFAULT_BLOCK_SIZE = 65536  # output samples interpolated per block
+CANONICAL_FS = 40.0         # Hz: the fastest firmware rate; 4, 10 and 20 Hz captures go up by whole factors
+MAX_DENOMINATOR = 64        # rate ratios are snapped to up / down with down <= this
+KAISER_BETA = 5.0           # anti-aliasing window, as scipy.signal.resample_poly
+
+# t_ms:     float64 uniform grid in milliseconds (step exactly 1000 / fs inside a segment)
+# values:   float32 resampled signal(s), shape (n_out,) or (n_out, n_channels)
+# segments: (k, 2) [start, stop) ranges of the output, one per input segment
+Resampled = namedtuple('Resampled', ['t_ms', 'values', 'segments'])
+
+
+# ---- 1. Uniform grid ----
+def uniform_grid(t_start_ms, t_end_ms, fs):
+    """Every 1/fs step from t_start_ms up to and including t_end_ms."""
+    step = 1000.0 / fs
+    n = int(np.floor((t_end_ms - t_start_ms) / step)) + 1
+    return t_start_ms + np.arange(n) * step
+
+
+# ---- 2. Timestamp-driven resampler ----
+def resample_uniform(t_ms, values, fs, segments=None, block_size=DEFAULT_BLOCK_SIZE):
+    """Put a jittered capture onto an exact fs grid using its own timestamps.
+
+    t_ms must be non-decreasing inside each segment (use the unwrapped
+    timeline from timestamps.py). Each segment gets its own grid so that
+    interpolation never bridges a reset or a logging pause; segments shorter
+    than two samples are dropped. Linear interpolation is done block by block
+    over the output grid, so temporaries are bounded by block_size.
+    """
+    t_ms = np.asarray(t_ms, dtype=np.float64)
+    values = np.asarray(values)
+    single = values.ndim == 1
+    if single:
+        values = values[:, None]
+    if segments is None:
+        segments = np.array([[0, len(t_ms)]])
+
+    grids = []
+    for start, stop in segments:
+        if stop - start >= 2:
+            grids.append((start, stop, uniform_grid(t_ms[start], t_ms[stop - 1], fs)))
+
+    n_out = sum(len(grid) for _, _, grid in grids)
+    out = np.empty((n_out, values.shape[1]), dtype=np.float32)
+    t_out = np.empty(n_out, dtype=np.float64)
+    out_segments = np.empty((len(grids), 2), dtype=np.int64)
+
+    pos = 0
+    for k, (start, stop, grid) in enumerate(grids):
+        t_seg = t_ms[start:stop]
+        v_seg = values[start:stop]
+        for b in range(0, len(grid), block_size):
+            g = grid[b:b + block_size]
+            # Only the input samples bracketing this block are touched
+            lo = max(int(np.searchsorted(t_seg, g[0], side='right')) - 1, 0)
+            hi = min(int(np.searchsorted(t_seg, g[-1], side='left')) + 1, len(t_seg))
+            for c in range(values.shape[1]):
+                out[pos + b:pos + b + len(g), c] = np.interp(g, t_seg[lo:hi], v_seg[lo:hi, c])
+        t_out[pos:pos + len(grid)] = grid
+        out_segments[k] = (pos, pos + len(grid))
+        pos += len(grid)
+
+    return Resampled(t_out, out[:, 0] if single else out, out_segments)
+
+
+def resample_frame(frame, fs, channels=('accel_mag', 'gyro_mag')):
+    """Resample named ImuFrame channels onto a uniform fs grid, segment by segment.
+
+    Returns a Resampled whose values has one column per requested channel.
+    """
+    timeline = frame.timeline
+    values = np.column_stack([getattr(frame, name) for name in channels])
+    return resample_uniform(timeline.t_ms, values, fs, timeline.segments)
+
+
+# ---- 3. Rational polyphase resampling to a canonical rate ----
+def rational_factors(fs_in, fs_out):
+    """(up, down) with fs_in * up / down = fs_out, down at most MAX_DENOMINATOR."""
+    ratio = Fraction(fs_out / fs_in).limit_denominator(MAX_DENOMINATOR)
+    return ratio.numerator, ratio.denominator
+
+
+def snapped_rate(fs_in, fs_out=CANONICAL_FS):
+    """The rate polyphase resampling from fs_in actually produces (fs_out unless the ratio had to be snapped)."""
+    up, down = rational_factors(fs_in, fs_out)
+    return fs_in * up / down
+
+
+@lru_cache(maxsize=FILTER_CACHE_SIZE)
+def _polyphase_bank(up, down):
+    # resample_poly's low-pass (cutoff at the lower Nyquist rate, 10 * max(up, down)
+    # taps each side), split into its `up` phases: row p holds taps p, p + up, ...
+    if up == down == 1:
+        bank = np.ones((1, 1))  # already at the target rate: a copy
+        bank.setflags(write=False)
+        return bank, 0
+    half_len = 10 * max(up, down)
+    h = firwin(2 * half_len + 1, 1.0 / max(up, down), window=('kaiser', KAISER_BETA)) * up
+    bank = np.zeros((up, -(-len(h) // up)))
+    for phase in range(up):
+        bank[phase, :len(h[phase::up])] = h[phase::up]
+    bank.setflags(write=False)
+    return bank, half_len
+
+
+class PolyphaseResampler:
+    """Uniformly sampled signal(s) from fs_in to fs_out by a rational factor, chunk by chunk.
+
+    Output sample j sits at input position j * down / up, so the grids
+    start together and the output stops at the last input sample (the
+    convention of uniform_grid). Each output is one row of the polyphase
+    filter bank dotted with the input samples under it: only the taps that
+    meet a real sample are multiplied, about 20 per output whatever the
+    ratio. The signal is extended with its first and last samples rather
+    than zeros, so the 1 g offset of accel_mag does not ring at the ends;
+    away from the ends the result equals scipy.signal.resample_poly(x, up, down).
+
+    process() returns the outputs whose input has all arrived (they trail
+    the input by about 10 * max(up, down) / up samples), flush() the rest;
+    concatenated they do not depend on the chunking. Memory is one filter
+    length of input. The filter bank is designed once per (up, down).
+    """
+
+    def __init__(self, fs_in, fs_out=CANONICAL_FS, block_size=DEFAULT_BLOCK_SIZE):
+        self.up, self.down = rational_factors(fs_in, fs_out)
+        self.fs_in = fs_in
+        self.fs_out = fs_in * self.up / self.down
+        self.block_size = block_size
+        self._bank, self._half_len = _polyphase_bank(self.up, self.down)
+        self.reset()
+
+    def reset(self):
+        self._buffer = None
+        self._buffer_start = 0  # input index of _buffer[0]
+        self.samples_seen = 0
+        self.samples_out = 0
+
+    def _outputs(self, stop):
+        # Outputs samples_out..stop-1, block_size at a time
+        out = []
+        for j0 in range(self.samples_out, stop, self.block_size):
+            base = np.arange(j0, min(j0 + self.block_size, stop)) * self.down + self._half_len
+            under = base[:, None] // self.up - np.arange(self._bank.shape[1])
+            under = np.clip(under, 0, self.samples_seen - 1) - self._buffer_start
+            out.append(np.einsum('jr,jr...->j...', self._bank[base % self.up], self._buffer[under]))
+        self.samples_out = max(stop, self.samples_out)
+        # Keep only the input the next output still reaches back to
+        newest = (self.samples_out * self.down + self._half_len) // self.up
+        keep_from = min(max(newest - self._bank.shape[1] + 1, 0), self.samples_seen - 1)
+        if keep_from > self._buffer_start:
+            self._buffer = self._buffer[keep_from - self._buffer_start:]
+            self._buffer_start = keep_from
+        if not out:
+            return self._buffer[:0].copy()
+        return np.concatenate(out).astype(self._buffer.dtype, copy=False)
+
+    def process(self, chunk):
+        """Add input samples, shape (n,) or (n, channels); returns the outputs that are now final."""
+        chunk = np.asarray(chunk)
+        if not np.issubdtype(chunk.dtype, np.floating):
+            chunk = chunk.astype(np.float64)
+        self._buffer = chunk if self._buffer is None else np.concatenate([self._buffer, chunk])
+        self.samples_seen += len(chunk)
+        if self.samples_seen == 0:
+            return chunk[:0]
+        # Output j is final once the newest input sample under it has arrived
+        stop = ((self.samples_seen - 1) * self.up - self._half_len) // self.down + 1
+        return self._outputs(max(stop, self.samples_out))
+
+    def flush(self):
+        """End of stream: the remaining outputs, up to the time of the last input sample."""
+        if self.samples_seen == 0:
+            return np.empty(0)
+        out = self._outputs((self.samples_seen - 1) * self.up // self.down + 1)
+        self.reset()
+        return out
+
+
+def resample_poly_uniform(values, fs, fs_out=CANONICAL_FS, block_size=DEFAULT_BLOCK_SIZE):
+    """PolyphaseResampler over a whole uniformly sampled array; the result is at snapped_rate(fs, fs_out)."""
+    resampler = PolyphaseResampler(fs, fs_out, block_size)
+    head = resampler.process(values)
+    return np.concatenate([head, resampler.flush()])
+
+
+def canonical_frame(frame, fs, fs_out=CANONICAL_FS, channels=('accel_mag', 'gyro_mag')):
+    """resample_frame() at the capture's own rate fs, then polyphase to fs_out, segment by segment.
+
+    Every capture comes out at the same rate, snapped_rate(fs, fs_out), so
+    one filter design and one set of thresholds in samples serve 4, 10, 20
+    and 40 Hz devices alike. Returns a Resampled like resample_frame().
+    """
+    native = resample_frame(frame, fs, channels)
+    step_ms = 1000.0 / snapped_rate(fs, fs_out)
+    parts, grids, segments, pos = [], [], [], 0
+    for start, stop in native.segments:
+        values = resample_poly_uniform(native.values[start:stop], fs, fs_out)
+        parts.append(values)
+        grids.append(native.t_ms[start] + np.arange(len(values)) * step_ms)
+        segments.append((pos, pos + len(values)))
+        pos += len(values)
+    if not parts:
+        return Resampled(np.empty(0), np.empty((0, len(channels)), dtype=np.float32), np.empty((0, 2), dtype=np.int64))
+    return Resampled(np.concatenate(grids), np.concatenate(parts), np.array(segments, dtype=np.int64))
@@ -0,0 +1,49 @@
+from collections import namedtuple
+
+import numpy as np
+
+# members: positions (into the grouped array) of every element of the kept groups, in order
+# starts:  offset into members where each kept group begins
+# stops:   offset into members where each kept group ends (exclusive)
+Groups = namedtuple('Groups', ['members', 'starts', 'stops'])
+
+
+# ---- 1. Split a sorted sequence wherever the gap is too large ----
+def split_on_gaps(values, max_gap):
+    """(starts, stops) of the runs of values whose consecutive differences are <= max_gap.
+
+    values is sorted (peak indices or peak times); a new run starts after
+    every difference > max_gap, as in the scripts' "current_group" loops.
+    stops are exclusive, so values[starts[k]:stops[k]] is run k.
+    """
+    values = np.asarray(values)
+    if len(values) == 0:
+        return np.empty(0, dtype=np.intp), np.empty(0, dtype=np.intp)
+    breaks = np.flatnonzero(np.diff(values) > max_gap) + 1
+    starts = np.r_[0, breaks].astype(np.intp)
+    stops = np.r_[breaks, len(values)].astype(np.intp)
+    return starts, stops
+
+
+# ---- 2. Keep runs by size ----
+def select_runs(starts, stops, min_size=1, max_size=None):
+    """Keep runs with min_size <= length <= max_size; returns Groups with offsets renumbered."""
+    sizes = stops - starts
+    keep = sizes >= min_size
+    if max_size is not None:
+        keep &= sizes <= max_size
+    members = np.flatnonzero(np.repeat(keep, sizes))  # runs tile 0..n, so this is every kept position
+    kept_sizes = sizes[keep]
+    new_stops = np.cumsum(kept_sizes).astype(np.intp)
+    return Groups(members, new_stops - kept_sizes, new_stops)
+
+
+def group_by_gap(values, max_gap, min_size=1, max_size=None):
+    """split_on_gaps() then select_runs(): runs of close values, filtered by length."""
+    return select_runs(*split_on_gaps(values, max_gap), min_size=min_size, max_size=max_size)
+
+
+def group_arrays(values, groups):
+    """The kept runs as a list of arrays (for plotting or printing)."""
+    picked = np.asarray(values)[groups.members]
+    return [picked[a:b] for a, b in zip(groups.starts, groups.stops)]
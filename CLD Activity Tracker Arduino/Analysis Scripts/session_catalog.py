@@ -0,0 +1,140 @@
+import argparse
+import hashlib
+import os
+import zipfile
+
+import numpy as np
+import pandas as pd
+
+from capture_metadata import SIDECAR_SUFFIX, capture_format, capture_metadata, load_frame
+from pedometer import count_steps_frame
+
+DEFAULT_CATALOG = 'capture_catalog.csv'
+CAPTURE_EXTENSIONS = ('.bin', '.csv', '.txt', '.imuz')
+HASH_CHUNK = 1 << 20
+
+LABEL_COLUMNS = ['subject', 'date', 'activity', 'gait', 'placement', 'steps', 'rate_hz']
+CATALOG_COLUMNS = (['path', 'format', 'size', 'mtime_ns', 'content_hash',
+                    'n_samples', 't_start_ms', 't_end_ms', 'duration_s', 'fs', 'n_segments', 'rate_mismatch']
+                   + LABEL_COLUMNS
+                   + ['step_count', 'active_minutes'])
+
+
+# ---- 1. Per-capture indexing ----
+def file_hash(filename):
+    h = hashlib.blake2b(digest_size=16)
+    with open(filename, 'rb') as f:
+        for chunk in iter(lambda: f.read(HASH_CHUNK), b''):
+            h.update(chunk)
+    return h.hexdigest()
+
+
+def index_capture(filename):
+    """One catalog row: format, shape, rate, labels, hash and pedometer summary.
+
+    Raises ValueError if the file is not a capture we know how to read, or
+    holds too few samples to measure a rate from.
+    """
+    meta = capture_metadata(filename)
+    frame = load_frame(filename)
+    if len(frame) < 2 or meta['fs'] is None:
+        raise ValueError(f"{filename}: {len(frame)} sample(s), no sample rate can be measured")
+    t_ms = frame.timeline.t_ms
+    row = {
+        'format': capture_format(filename),
+        'size': meta['signature']['size'],
+        'mtime_ns': meta['signature']['mtime_ns'],
+        'content_hash': file_hash(filename),
+        'n_samples': len(frame),
+        't_start_ms': int(t_ms[0]),
+        't_end_ms': int(t_ms[-1]),
+        'duration_s': meta['duration_s'],
+        'fs': meta['fs'],
+        'n_segments': meta['n_segments'],
+        'rate_mismatch': meta['rate_mismatch'],
+    }
+    row.update({name: meta['labels'][name] for name in LABEL_COLUMNS})
+    try:
+        result, _ = count_steps_frame(frame, fs=meta['fs'])
+        row['step_count'] = result.step_count
+        row['active_minutes'] = result.active_s / 60.0
+    except ValueError:
+        # Too short to filter (filtfilt padding) -- keep the row, skip the summary
+        row['step_count'] = np.nan
+        row['active_minutes'] = np.nan
+    return row
+
+
+# ---- 2. Incremental catalog ----
+def discover_captures(roots, extensions=CAPTURE_EXTENSIONS, exclude=()):
+    """Files under roots with a capture extension, minus metadata sidecars and the paths in exclude."""
+    exclude = {os.path.abspath(path) for path in exclude}
+    for root in roots:
+        for dirpath, _, filenames in os.walk(root):
+            for name in sorted(filenames):
+                path = os.path.join(dirpath, name)
+                if (name.lower().endswith(extensions) and not name.endswith(SIDECAR_SUFFIX)
+                        and os.path.abspath(path) not in exclude):
+                    yield path
+
+
+def load_catalog(catalog_path=DEFAULT_CATALOG):
+    if not os.path.exists(catalog_path):
+        return pd.DataFrame(columns=CATALOG_COLUMNS)
+    return pd.read_csv(catalog_path)
+
+
+def build_catalog(roots, catalog_path=DEFAULT_CATALOG, extensions=CAPTURE_EXTENSIONS):
+    """Create or update the catalog, re-indexing only captures whose size or mtime changed.
+
+    Paths are stored relative to the catalog file. Rows for deleted files are
+    dropped; files that are not readable captures (including empty, truncated
+    or corrupt ones) are kept as 'unsupported' rows so they are not re-parsed
+    next time.
+    """
+    base = os.path.dirname(os.path.abspath(catalog_path))
+    existing = {row['path']: row for row in load_catalog(catalog_path).to_dict('records')}
+
+    rows, reused, indexed, skipped = [], 0, 0, 0
+    # The catalog itself may sit inside a scanned root
+    for filename in discover_captures(roots, extensions, exclude=(catalog_path,)):
+        rel = os.path.relpath(os.path.abspath(filename), base)
+        st = os.stat(filename)
+        old = existing.get(rel)
+        if old is not None and old['size'] == st.st_size and old['mtime_ns'] == st.st_mtime_ns:
+            rows.append(old)
+            reused += 1
+            continue
+        try:
+            row = index_capture(filename)
+            indexed += 1
+        except (ValueError, OSError, zipfile.BadZipFile):
+            # Remember it, so unchanged non-captures are not re-parsed on every run
+            row = {'format': 'unsupported', 'size': st.st_size, 'mtime_ns': st.st_mtime_ns}
+            skipped += 1
+        row['path'] = rel
+        rows.append(row)
+
+    catalog = pd.DataFrame(rows, columns=CATALOG_COLUMNS)
+    catalog.to_csv(catalog_path, index=False)
+    print(f"Catalog {catalog_path}: {indexed} indexed, {skipped} unsupported, {reused} unchanged")
+    return catalog
+
+
+# ---- 3. Queries ----
+def find_captures(catalog, **criteria):
+    """Rows matching every criterion, e.g. find_captures(cat, fs=40, placement='ankle')."""
+    mask = np.ones(len(catalog), dtype=bool)
+    for column, value in criteria.items():
+        mask &= (catalog[column] == value).to_numpy()
+    return catalog[mask]
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description="Build or update the capture catalog.")
+    parser.add_argument('roots', nargs='+', help="directories to scan")
+    parser.add_argument('--catalog', default=DEFAULT_CATALOG)
+    args = parser.parse_args()
+    catalog = build_catalog(args.roots, args.catalog)
+    catalog = catalog[catalog['format'] != 'unsupported']
+    print(catalog[['path', 'fs', 'n_samples', 'duration_s', 'steps', 'step_count']].to_string(index=False))
@@ -0,0 +1,312 @@
+import sys
+import time
+from collections import namedtuple
+
+import numpy as np
+from scipy.signal import find_peaks
+
+from pedometer import DEFAULT_PARAMS
+from quantile_sketch import DEFAULT_COMPRESSION, QuantileSketch
+from streaming_filter import ZeroPhaseBandpass
+
+# index: sample index of the step peak in the stream
+# t:     its time (s)
+# steps: running step count including this event
+StepEvent = namedtuple('StepEvent', ['index', 't', 'steps'])
+
+REPLAY_COMPRESSION = 1000  # sketch size for replay thresholds: exact percentiles up to 5000 samples
+
+
+# ---- 1. find_peaks(height, prominence, distance) on a stream ----
+class _Candidate:
+    __slots__ = ('index', 't', 'height', 'min_prominence', 'left_ok', 'right_min', 'right_ok', 'keep')
+
+    def __init__(self, index, t, height, min_prominence, left_min):
+        self.index, self.t, self.height, self.min_prominence = index, t, height, min_prominence
+        self.left_ok = left_min <= height - min_prominence
+        self.right_min = height
+        self.right_ok = None  # None until the right-hand base is known
+        self.keep = None      # distance rule: None until decided
+
+
+class StreamingPeaks:
+    """scipy.signal.find_peaks(x, height, prominence, distance) over x arriving in chunks.
+
+    Peaks come out in order, once nothing later in the stream can change
+    them, and are the ones find_peaks would return on the whole stream:
+
+    - Local maxima (plateaus included) are found per chunk with find_peaks
+      itself; only a trailing run of equal samples is carried over.
+    - Prominence >= p means the signal dips at least p below the peak on
+      both sides before rising above it. The left side comes from a
+      monotonic stack of the extrema so far, the right side is settled when
+      the next higher extremum (or a deep enough trough) arrives. Only
+      extrema are visited, a few per second.
+    - The distance rule (tallest first, neighbours closer than `distance`
+      dropped) only depends on taller peaks, so a candidate is decided as
+      soon as the stream is `distance` past it and its taller neighbours are.
+
+    height is read when each local maximum is found, so it may change while
+    streaming (e.g. a running percentile); prominence is then
+    height * prominence_ratio. State is the stack and the undecided
+    candidates -- a handful of entries, not the history. (The one possible
+    difference from find_peaks: two peaks within `distance` of each other
+    with exactly equal heights, where find_peaks' own tie order is
+    unspecified.)
+    """
+
+    def __init__(self, distance, prominence_ratio, height=None):
+        self.distance = max(int(np.ceil(distance)), 1)
+        self.prominence_ratio = prominence_ratio
+        self.height = height
+        self.reset()
+
+    def reset(self):
+        self._x = np.empty(0)   # trailing samples not yet scanned for maxima
+        self._t = np.empty(0)
+        self._start = 0         # stream index of _x[0]
+        self._started = False
+        self._stack = []        # [value, lowest value since the previous higher extremum]
+        self._candidates = []   # undecided or not yet emitted, in index order
+        self._kept = []         # emitted peaks that can still suppress an undecided neighbour
+
+    def _extremum(self, value, is_peak, index, t, boundary):
+        # Left side: pop everything not higher, tracking the lowest value on the way
+        low = value
+        while self._stack and self._stack[-1][0] <= value:
+            low = min(low, self._stack.pop()[1])
+        self._stack.append([value, low])
+        # Right side of the earlier candidates
+        for c in self._candidates:
+            if c.right_ok is None:
+                c.right_min = min(c.right_min, value)
+                if c.right_min <= c.height - c.min_prominence:
+                    c.right_ok = True
+                elif value > c.height:
+                    c.right_ok = False
+        if is_peak and not boundary and self.height is not None and value >= self.height:
+            self._candidates.append(_Candidate(index, t, value, self.height * self.prominence_ratio, low))
+
+    def _decide(self, horizon):
+        # Tallest first (equal heights: later first, as find_peaks orders them);
+        # each decision only needs the decisions of the neighbours ranked above
+        pending = [c for c in self._candidates if c.keep is None and c.index + self.distance <= horizon]
+        for c in sorted(pending, key=lambda c: (c.height, c.index), reverse=True):
+            close = [q for q in self._kept + self._candidates
+                     if q is not c and abs(q.index - c.index) < self.distance
+                     and (q.height, q.index) > (c.height, c.index)]
+            if any(q.keep is None for q in close):
+                continue
+            c.keep = not any(q.keep for q in close)
+
+    def _emit(self):
+        out = []
+        while self._candidates:
+            c = self._candidates[0]
+            if c.keep is None or (c.keep and c.right_ok is None):
+                break
+            self._candidates.pop(0)
+            if c.keep:
+                self._kept.append(c)
+                if c.left_ok and c.right_ok:
+                    out.append((c.index, c.t))
+        if self._candidates:
+            oldest = self._candidates[0].index
+            self._kept = [c for c in self._kept if c.index + self.distance > oldest]
+        return out
+
+    def update(self, x, t):
+        """Add filtered samples and their times; returns [(index, t), ...] of final peaks."""
+        x = np.asarray(x, dtype=np.float64)
+        if len(x) == 0:
+            return []
+        ext_x = np.concatenate([self._x, x])
+        ext_t = np.concatenate([self._t, np.asarray(t, dtype=np.float64)])
+        if not self._started:
+            # The stream's first sample bounds every left-hand base
+            self._extremum(ext_x[0], False, 0, ext_t[0], True)
+            self._started = True
+
+        # Everything before the trailing run of equal samples is settled
+        changes = np.flatnonzero(ext_x[1:] != ext_x[:-1])
+        final = int(changes[-1]) + 1 if len(changes) else 0
+        self._scan(ext_x, ext_t, final)
+        keep_from = max(final - 1, 0)
+        self._x, self._t = ext_x[keep_from:], ext_t[keep_from:]
+        self._start += keep_from
+        self._decide(self._start + 1)  # maxima before the carried samples are all known
+        return self._emit()
+
+    def flush(self):
+        """End of stream: the last sample bounds the right-hand side of every open candidate."""
+        if len(self._x):
+            self._extremum(self._x[-1], False, self._start + len(self._x) - 1, self._t[-1], True)
+        for c in self._candidates:
+            if c.right_ok is None:
+                c.right_ok = c.right_min <= c.height - c.min_prominence
+        self._decide(np.inf)
+        out = self._emit()
+        self.reset()
+        return out
+
+    def _scan(self, ext_x, ext_t, final):
+        # Extrema of ext_x[:final] not reported yet (index 0 never is), in order
+        peaks, _ = find_peaks(ext_x)
+        troughs, _ = find_peaks(-ext_x)
+        peaks, troughs = peaks[peaks < final], troughs[troughs < final]
+        events = np.concatenate([peaks, troughs])
+        is_peak = np.r_[np.ones(len(peaks), bool), np.zeros(len(troughs), bool)]
+        for k in np.argsort(events, kind='stable'):
+            i = events[k]
+            self._extremum(ext_x[i], bool(is_peak[k]), self._start + int(i), ext_t[i], False)
+
+
+# ---- 2. Pedometer_Script.py on a stream ----
+class StepCounter:
+    """count_steps() for one live stream of accel_mag samples at a fixed rate fs.
+
+    ZeroPhaseBandpass -> StreamingPeaks -> gait confirmation, all online:
+    a peak is confirmed once it is the min_consecutive_steps-th of a run
+    (the earlier ones of the run are confirmed with it) or extends a run
+    already confirmed, and every confirmed peak comes out as a StepEvent.
+    Results trail the input by the filter's lookahead (see
+    ZeroPhaseBandpass) plus `distance` samples.
+
+    The peak height is height_threshold if given (e.g. from a previous
+    session, a pooled QuantileSketch, or replay_count()'s first pass);
+    otherwise the running height_percentile of the filtered signal so far,
+    from a QuantileSketch, which settles after the first minute or so.
+    State is the filter's buffer, the sketch and a few pending peaks, so
+    hundreds of streams fit in memory.
+    """
+
+    def __init__(self, fs, height_threshold=None, compression=DEFAULT_COMPRESSION, block_size=256, **params):
+        self.fs = fs
+        self.params = dict(DEFAULT_PARAMS, **params)
+        p = self.params
+        self.height_threshold = height_threshold
+        self.filter = ZeroPhaseBandpass(p['lowcut'], p['highcut'], fs, p['order'], block_size)
+        self.peaks = StreamingPeaks(max(int(p['distance_s'] * fs), 1), p['prominence_ratio'], height_threshold)
+        self.compression = compression
+        self.reset()
+
+    def reset(self):
+        self.filter.reset()
+        self.peaks.reset()
+        self.sketch = None if self.height_threshold is not None else QuantileSketch(self.compression)
+        self._t = np.empty(0)     # times of raw samples not out of the filter yet
+        self._samples = 0
+        self._run = []            # (index, t) of the current run while it is too short to count
+        self._last_t = None       # time of the latest peak
+        self._confirmed = False   # whether the current run has been confirmed
+        self.step_count = 0
+        self.active_s = 0.0       # time spanned by confirmed runs, as count_steps' active_s
+
+    def _confirm(self, peaks):
+        p = self.params
+        events = []
+        for index, t in peaks:
+            if self._last_t is not None and t - self._last_t > p['max_step_interval_s']:
+                self._run, self._confirmed = [], False
+            elif self._confirmed:
+                self.active_s += t - self._last_t
+            self._last_t = t
+            self._run.append((index, t))
+            if not self._confirmed and len(self._run) < p['min_consecutive_steps']:
+                continue
+            if not self._confirmed:
+                self.active_s += t - self._run[0][1]
+                self._confirmed = True
+            for index, t in self._run:
+                self.step_count += p['step_multiplier']
+                events.append(StepEvent(index, t, self.step_count))
+            self._run = []
+        return events
+
+    def _peaks(self, filtered):
+        if len(filtered) == 0:
+            return []
+        t, self._t = self._t[:len(filtered)], self._t[len(filtered):]
+        if self.sketch is not None:
+            self.sketch.update(filtered)
+            self.peaks.height = self.sketch.percentile(self.params['height_percentile'])
+        return self.peaks.update(filtered, t)
+
+    def update(self, accel_mag, t=None):
+        """Add samples (t in seconds; sample index / fs if omitted); returns the new StepEvents."""
+        accel_mag = np.asarray(accel_mag, dtype=np.float64)
+        if t is None:
+            t = (self._samples + np.arange(len(accel_mag))) / self.fs
+        self._samples += len(accel_mag)
+        self._t = np.concatenate([self._t, np.asarray(t, dtype=np.float64)])
+        return self._confirm(self._peaks(self.filter.process(accel_mag)))
+
+    def flush(self):
+        """End of stream: the StepEvents still held back by the filter and the peak search."""
+        peaks = self._peaks(self.filter.flush()) + self.peaks.flush()
+        return self._confirm(peaks)
+
+
+def replay_count(accel_mag, fs, chunk_size=20, t=None, **params):
+    """Step count of a recording replayed as a stream, with count_steps()' threshold.
+
+    Two passes in bounded memory: the first streams the filtered signal
+    into a QuantileSketch for the recording's height_percentile, the second
+    counts with that threshold fixed. Returns (step_count, events, active_s).
+    """
+    p = dict(DEFAULT_PARAMS, **params)
+    accel_mag = np.asarray(accel_mag, dtype=np.float64)
+    bandpass = ZeroPhaseBandpass(p['lowcut'], p['highcut'], fs, p['order'])
+    sketch = QuantileSketch(REPLAY_COMPRESSION)
+    for i in range(0, len(accel_mag), chunk_size):
+        sketch.update(bandpass.process(accel_mag[i:i + chunk_size]))
+    sketch.update(bandpass.flush())
+
+    counter = StepCounter(fs, height_threshold=sketch.percentile(p['height_percentile']), **params)
+    events = []
+    for i in range(0, len(accel_mag), chunk_size):
+        events += counter.update(accel_mag[i:i + chunk_size], None if t is None else t[i:i + chunk_size])
+    events += counter.flush()
+    return counter.step_count, events, counter.active_s
+
+
+# ---- 3. Replay check against count_steps, and many streams at once ----
+if __name__ == '__main__':
+    from capture_metadata import capture_metadata, load_frame
+    from pedometer import count_steps_frame
+    from resample import resample_frame
+
+    n_streams = 200
+    recordings = []
+    for filename in sys.argv[1:]:
+        fs = capture_metadata(filename)['fs']
+        frame = load_frame(filename)
+        offline, _ = count_steps_frame(frame, fs=fs)
+        resampled = resample_frame(frame, fs, channels=('accel_mag',))
+        t = (resampled.t_ms - resampled.t_ms[0]) / 1000.0
+        accel_mag = resampled.values[:, 0]
+        replayed, _, _ = replay_count(accel_mag, fs, t=t)
+
+        live = StepCounter(fs)
+        for i in range(0, len(accel_mag), 20):
+            live.update(accel_mag[i:i + 20], t[i:i + 20])
+        live.flush()
+        recordings.append((accel_mag, fs))
+        print(f"{filename}: offline {offline.step_count}, replay {replayed} "
+              f"({'same' if replayed == offline.step_count else 'DIFFERENT'}), "
+              f"live percentile {live.step_count}")
+
+    if recordings:
+        # n_streams counters fed 20-sample notifications in turn, as a gateway would
+        accel_mag, fs = recordings[0]
+        counters = [StepCounter(fs) for _ in range(n_streams)]
+        start = time.perf_counter()
+        for i in range(0, len(accel_mag), 20):
+            for counter in counters:
+                counter.update(accel_mag[i:i + 20])
+        for counter in counters:
+            counter.flush()
+        elapsed = time.perf_counter() - start
+        rate = n_streams * len(accel_mag) / elapsed
+        print(f"{n_streams} streams of {len(accel_mag)} samples: {rate:,.0f} samples/s, "
+              f"{rate / fs:,.0f} real-time streams at {fs:g} Hz")
@@ -0,0 +1,187 @@
+import sys
+import time
+
+import numpy as np
+from scipy.signal import group_delay, sosfilt, sosfilt_zi
+
+from filter_design import DEFAULT_TOLERANCE, bandpass_sos, filtfilt_channels, impulse_decay_length
+from pedometer import DEFAULT_PARAMS
+
+
+# ---- 1. Causal bandpass with carried state ----
+class StreamingBandpass:
+    """Causal Butterworth bandpass that filters a live stream chunk by chunk.
+
+    Same design as Pedometer_Script.py (order 4, 0.2-1.5 Hz by default),
+    but run forward only with sosfilt, carrying the filter state between
+    calls. Feeding a recording in chunks of any size (one BLE notification,
+    one sample, or everything at once) gives exactly the same output as
+    filtering it in one go. Chunks are (n,) or (n, channels) and are
+    filtered along axis 0.
+
+    Unlike filtfilt this is not zero-phase: output lags the input by the
+    filter's group delay, which is finite and reported by group_delay_s().
+    For the default band it is about 0.64 s at the band centre (~0.55 Hz,
+    i.e. walking cadence) and peaks at about 3.8 s right at the 0.2 Hz
+    edge, at any fs.
+
+    process_sample() is a pure-Python fast path for one scalar sample per
+    BLE notification (a few microseconds, versus ~70 us for a numpy call on
+    a 1-sample chunk); both paths share the same state.
+    """
+
+    def __init__(self, lowcut=DEFAULT_PARAMS['lowcut'], highcut=DEFAULT_PARAMS['highcut'],
+                 fs=40.0, order=DEFAULT_PARAMS['order']):
+        self.lowcut, self.highcut, self.fs, self.order = lowcut, highcut, fs, order
+        self.sos = bandpass_sos(lowcut, highcut, fs, order)
+        self._zi_unit = sosfilt_zi(self.sos)  # steady state for a unit step input
+        self.zi = None
+        self._state = None  # process_sample()'s copy of zi as Python floats
+        self.samples_seen = 0
+
+    def reset(self):
+        """Forget the stream, e.g. after a reconnect or a firmware reset."""
+        self.zi = None
+        self._state = None
+        self.samples_seen = 0
+
+    def process(self, chunk):
+        """Filter the next chunk; returns an array of the same shape."""
+        chunk = np.asarray(chunk, dtype=np.float64)
+        if len(chunk) == 0:
+            return chunk.copy()
+        if self._state is not None:
+            self.zi = np.array(self._state)
+        if self.zi is None:
+            # Start as if the first sample had been there forever, so the
+            # stream does not begin with a step response (filtfilt pads for the same reason)
+            first = chunk[0]
+            self.zi = self._zi_unit.reshape(self._zi_unit.shape + (1,) * np.ndim(first)) * first
+        out, self.zi = sosfilt(self.sos, chunk, axis=0, zi=self.zi)
+        self._state = None
+        self.samples_seen += len(chunk)
+        return out
+
+    def process_sample(self, x):
+        """Filter one scalar sample (single-channel streams only)."""
+        x = float(x)
+        if self._state is None:
+            if self.zi is None:
+                self.zi = self._zi_unit * x
+            self._state = self.zi.tolist()
+            self._coeffs = self.sos.tolist()
+        # Direct form II transposed, section by section -- what sosfilt does
+        for (b0, b1, b2, _, a1, a2), z in zip(self._coeffs, self._state):
+            y = b0 * x + z[0]
+            z[0] = b1 * x - a1 * y + z[1]
+            z[1] = b2 * x - a2 * y
+            x = y
+        self.zi = None  # rebuilt from _state if process() is called next
+        self.samples_seen += 1
+        return x
+
+    # ---- Delay introduced by the causal filter ----
+    def group_delay_samples(self, freqs_hz=None):
+        """Group delay in samples at freqs_hz (default: the passband centre)."""
+        if freqs_hz is None:
+            freqs_hz = np.sqrt(self.lowcut * self.highcut)
+        freqs_hz = np.atleast_1d(np.asarray(freqs_hz, dtype=np.float64))
+        w = 2 * np.pi * freqs_hz / self.fs
+        delay = np.zeros(len(w))
+        for section in self.sos:
+            delay += group_delay((section[:3], section[3:]), w=w)[1]
+        return delay if len(delay) > 1 else float(delay[0])
+
+    def group_delay_s(self, freqs_hz=None):
+        return self.group_delay_samples(freqs_hz) / self.fs
+
+    def max_passband_delay_s(self, n_points=256):
+        """Worst-case delay across the passband (it peaks near the band edges)."""
+        freqs = np.linspace(self.lowcut, self.highcut, n_points)
+        return float(np.max(self.group_delay_s(freqs)))
+
+
+# ---- 2. Zero-phase bandpass with a fixed lookahead ----
+class ZeroPhaseBandpass:
+    """filtfilt_blockwise() fed chunk by chunk: zero-phase output, delivered late.
+
+    Raw samples are buffered until a block of block_size can be filtered
+    with `overlap` samples of context on both sides; the block's middle is
+    then final and returned. The output is identical to
+    filtfilt_blockwise(sos, whole_stream, block_size=block_size) (so within
+    about 2 * tol * max|x| of sosfiltfilt on the whole recording), at the
+    cost of a delay of up to block_size + overlap samples -- around 40 s for
+    the default band at any fs with tol=1e-6. flush() filters what is left
+    once the stream ends. Memory is block_size + 2 * overlap samples.
+    """
+
+    def __init__(self, lowcut=DEFAULT_PARAMS['lowcut'], highcut=DEFAULT_PARAMS['highcut'],
+                 fs=40.0, order=DEFAULT_PARAMS['order'], block_size=256, tol=DEFAULT_TOLERANCE):
+        self.sos = bandpass_sos(lowcut, highcut, fs, order)
+        self.block_size = block_size
+        self.overlap = impulse_decay_length(self.sos, tol)
+        self.reset()
+
+    def reset(self):
+        self._buffer = np.empty(0)
+        self._buffer_start = 0  # stream index of _buffer[0]
+        self.samples_seen = 0
+        self.samples_out = 0
+
+    def _filter_blocks(self, final):
+        out = []
+        while self.samples_out < self.samples_seen:
+            start = self.samples_out
+            stop = min(start + self.block_size, self.samples_seen)
+            if not final and stop + self.overlap > self.samples_seen:
+                break  # right-hand context not here yet
+            lo, hi = max(start - self.overlap, 0), min(stop + self.overlap, self.samples_seen)
+            filtered = filtfilt_channels(self.sos, self._buffer[lo - self._buffer_start:hi - self._buffer_start])
+            out.append(filtered[start - lo:stop - lo])
+            self.samples_out = stop
+        # Keep only the left-hand context of the next block
+        keep_from = max(self.samples_out - self.overlap, 0)
+        self._buffer = self._buffer[keep_from - self._buffer_start:]
+        self._buffer_start = keep_from
+        return np.concatenate(out) if out else np.empty(0)
+
+    def process(self, chunk):
+        """Add raw samples; returns the filtered samples that are now final (possibly none)."""
+        chunk = np.asarray(chunk, dtype=np.float64)
+        self._buffer = np.concatenate([self._buffer, chunk])
+        self.samples_seen += len(chunk)
+        return self._filter_blocks(final=False)
+
+    def flush(self):
+        """End of stream: the remaining filtered samples."""
+        return self._filter_blocks(final=True)
+
+
+# ---- 3. Replay check: chunked == one-shot, and per-sample cost ----
+if __name__ == '__main__':
+    from capture_metadata import capture_metadata, load_frame
+
+    filename = sys.argv[1]
+    chunk_size = int(sys.argv[2]) if len(sys.argv) > 2 else 20  # samples per BLE notification
+    fs = capture_metadata(filename)['fs']
+    signal = load_frame(filename).accel_mag
+    one_shot = StreamingBandpass(fs=fs).process(signal)
+
+    live = StreamingBandpass(fs=fs)
+    start = time.perf_counter()
+    chunked = np.concatenate([live.process(signal[i:i + chunk_size])
+                              for i in range(0, len(signal), chunk_size)])
+    chunk_us = (time.perf_counter() - start) / len(signal) * 1e6
+
+    live.reset()
+    start = time.perf_counter()
+    per_sample = np.array([live.process_sample(x) for x in signal.tolist()])
+    sample_us = (time.perf_counter() - start) / len(signal) * 1e6
+
+    print(f"{len(signal)} samples at {fs:g} Hz")
+    print(f"  chunks of {chunk_size}: {chunk_us:.1f} us/sample, "
+          f"max |chunked - one-shot| = {np.max(np.abs(chunked - one_shot)):.2e}")
+    print(f"  process_sample: {sample_us:.1f} us/sample, "
+          f"max |per-sample - one-shot| = {np.max(np.abs(per_sample - one_shot)):.2e}")
+    print(f"Group delay: {live.group_delay_s():.3f} s at band centre, "
+          f"{live.max_passband_delay_s():.3f} s worst case in the passband")
@@ -1,53 +1,29 @@
 import numpy as np
 import pandas as pd
-from scipy.signal import butter, filtfilt, find_peaks
+from scipy.signal import find_peaks
 import matplotlib.pyplot as plt
+from imu_frame import ImuFrame
+from filter_design import butter_bandpass_filter
 
-# ---- 1. Filtering function ----
-def butter_bandpass_filter(data, lowcut, highcut, fs, order=4):
-    nyq = 0.5 * fs
-    low, high = lowcut / nyq, highcut / nyq
-    b, a = butter(order, [low, high], btype='band')
-    return filtfilt(b, a, data)
+# ---- 1. Filtering function: see filter_design.py ----
 
 # ---- 2. Load IMU binary data ----
-log_dtype = np.dtype([
-    ('timestamp', np.uint32),
-    ('ax_raw', np.int16),
-    ('ay_raw', np.int16),
-    ('az_raw', np.int16),
-    ('gx_raw', np.int16),
-    ('gy_raw', np.int16),
-    ('gz_raw', np.int16),
-])
-
 filename = '/Users/annalee/Documents/BME390/testing files/imu_data_10_27_adam_walk.bin'
-data = np.fromfile(filename, dtype=log_dtype)
+frame = ImuFrame.from_bin(filename)
 
-if len(data) == 0:
+if len(frame) == 0:
     raise ValueError("No IMU data found in file.")
 
-# Convert to DataFrame for convenience
-df = pd.DataFrame(data)
-print(df.head())
+print(pd.DataFrame(frame.records[:5]))
 
 # ---- 3. Convert raw sensor data to physical units ----
-df["ax_g"] = df["ax_raw"] / 16384.0
-df["ay_g"] = df["ay_raw"] / 16384.0
-df["az_g"] = df["az_raw"] / 16384.0
-
-df["gx_dps"] = df["gx_raw"] / 131.0
-df["gy_dps"] = df["gy_raw"] / 131.0
-df["gz_dps"] = df["gz_raw"] / 131.0
-
+# ImuFrame derives ax_g…gz_dps lazily in float32 on first access
 # ---- 4. Compute magnitudes ----
-df["accel_mag"] = np.sqrt(df["ax_g"]**2 + df["ay_g"]**2 + df["az_g"]**2)
-df["gyro_mag"]  = np.sqrt(df["gx_dps"]**2 + df["gy_dps"]**2 + df["gz_dps"]**2)
-accel_mag = df["accel_mag"]
+accel_mag = frame.accel_mag
 
 # ---- 5. Prepare time base ----
 fs = 50  # Hz — adjust to your actual sampling rate
-t = (df["timestamp"] - df["timestamp"].iloc[0]) / 1000.0  # convert ms → s
+t = frame.t  # seconds since first sample
 
 plt.figure(figsize=(12, 6))
 plt.plot(t, accel_mag, color="steelblue", linewidth=1.0, label="Raw Accelerometer Data")
@@ -61,8 +37,8 @@ plt.show()
 
 
 # ---- 6. Filter both signals ----
-a_filt = butter_bandpass_filter(df["accel_mag"], 0.3, 5.0, fs)
-g_filt = butter_bandpass_filter(df["gyro_mag"], 0.3, 5.0, fs)
+a_filt = butter_bandpass_filter(frame.accel_mag, 0.3, 5.0, fs)
+g_filt = butter_bandpass_filter(frame.gyro_mag, 0.3, 5.0, fs)
 
 # ---- 7. Combine into unified "activity index" ----
 activity_index = 0.7 * a_filt + 0.3 * (g_filt / np.max(g_filt)) * np.mean(a_filt)
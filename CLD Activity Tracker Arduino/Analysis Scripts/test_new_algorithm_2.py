@@ -1,19 +1,15 @@
 import numpy as np
 import pandas as pd
-from scipy.signal import butter, filtfilt, find_peaks, hilbert
 from scipy.ndimage import uniform_filter1d
 import matplotlib.pyplot as plt
+from imu_frame import ImuFrame
+from filter_design import bandpass_channels
+from envelope import hilbert_envelope
+from adaptive_peaks import adaptive_find_peaks, threshold_schedule
 
 # ---------------------------------------------
-# Bandpass filter helper
+# Bandpass filter helper: see filter_design.py
 # ---------------------------------------------
-def butter_bandpass_filter(data, lowcut, highcut, fs, order=4):
-    nyq = 0.5 * fs
-    low, high = lowcut / nyq, highcut / nyq
-    if low <= 0 or high >= 1 or low >= high:
-        raise ValueError(f"Invalid cutoff frequencies: low={lowcut}, high={highcut}, fs={fs}")
-    b, a = butter(order, [low, high], btype='band')
-    return filtfilt(b, a, data)
 
 # -------------------------------
 # Input / Output
@@ -21,57 +17,26 @@ def butter_bandpass_filter(data, lowcut, highcut, fs, order=4):
 filename_bin = '/Users/annalee/Documents/BME390/testing files/imu_data_10_27_adam_walk.bin'
 filename_csv = '/Users/annalee/Documents/BME390/testing files/imu_data_10_27_adam_walk.csv'
 
-# -------------------------------
-# Define binary structure
-# -------------------------------
-log_dtype = np.dtype([
-    ('timestamp', np.uint32),
-    ('ax_raw', np.int16),
-    ('ay_raw', np.int16),
-    ('az_raw', np.int16),
-    ('gx_raw', np.int16),
-    ('gy_raw', np.int16),
-    ('gz_raw', np.int16),
-])
-
 # -------------------------------
 # Read binary file
 # -------------------------------
-data = np.fromfile(filename_bin, dtype=log_dtype)
-if len(data) == 0:
+frame = ImuFrame.from_bin(filename_bin)
+if len(frame) == 0:
     raise ValueError("No IMU data found in file.")
 
-df = pd.DataFrame(data)
-
-# -------------------------------
-# Convert raw values to physical units
-# -------------------------------
-df["ax_g"] = df["ax_raw"] / 16384.0
-df["ay_g"] = df["ay_raw"] / 16384.0
-df["az_g"] = df["az_raw"] / 16384.0
-
-df["gx_dps"] = df["gx_raw"] / 131.0
-df["gy_dps"] = df["gy_raw"] / 131.0
-df["gz_dps"] = df["gz_raw"] / 131.0
-
-# -------------------------------
-# Compute vector magnitudes
-# -------------------------------
-df["accel_mag"] = np.sqrt(df["ax_g"]**2 + df["ay_g"]**2 + df["az_g"]**2)
-df["gyro_mag"]  = np.sqrt(df["gx_dps"]**2 + df["gy_dps"]**2 + df["gz_dps"]**2)
+# Physical units and vector magnitudes are derived lazily by ImuFrame
 
 # ---------------------------------------------
 # Time base
 # ---------------------------------------------
 fs = 50  # Hz (replace with actual sample rate)
-t = (df["timestamp"] - df["timestamp"].iloc[0]) / 1000.0  # convert ms → s
+t = frame.t  # seconds since first sample
 
 # ---------------------------------------------
 # Bandpass filter both accel and gyro
 # ---------------------------------------------
 lowcut, highcut = 0.3, 8.0  # motion-relevant band
-a_filt = butter_bandpass_filter(df["accel_mag"], lowcut, highcut, fs)
-g_filt = butter_bandpass_filter(df["gyro_mag"], lowcut, highcut, fs)
+a_filt, g_filt = bandpass_channels(frame.channels(('accel_mag', 'gyro_mag')), lowcut, highcut, fs).T
 
 # ---------------------------------------------
 # Combine signals into a unified "activity index"
@@ -89,28 +54,19 @@ sig_zero = sig - np.mean(sig)
 # Smooth signal to reduce noise
 sig_smooth = uniform_filter1d(sig_zero, size=5)
 
-# Hilbert envelope
-analytic = hilbert(sig_smooth)
-envelope = np.abs(analytic)
+# Hilbert envelope (FIR Hilbert transformer down to the bandpass low cut, see envelope.py)
+envelope = hilbert_envelope(sig_smooth, fs, lowcut)
 env_med, env_std = np.median(envelope), np.std(envelope)
 
-# Adaptive peak detection
+# Adaptive peak detection: up to 6 (prominence, height) steps, multipliers shrinking
+# x0.1 / x0.2 each step, first one giving 3+ peaks (and < half the samples) wins
 prom_mult = 0.1
 height_mult = 0.2
 min_distance_samples = int(0.5 * fs)  # minimum samples between peaks
-peaks = []
-
-for attempt in range(6):
-    prominence = env_std * prom_mult
-    height = env_med + env_std * height_mult
-    peaks_candidate, props = find_peaks(sig_smooth, prominence=prominence, height=height, distance=min_distance_samples)
-    if len(peaks_candidate) >= 3 and len(peaks_candidate) < len(sig) / 2:
-        peaks = peaks_candidate
-        used_prom, used_height = prominence, height
-        break
-    prom_mult *= 0.1
-    height_mult *= 0.2
-    peaks, used_prom, used_height = peaks_candidate, prominence, height
+prominences, heights = threshold_schedule(env_med, env_std, prom_mult, height_mult,
+                                          prom_decay=0.1, height_decay=0.2, attempts=6)
+peaks, used_prom, used_height, _, _ = adaptive_find_peaks(sig_smooth, prominences, heights,
+                                                         distance=min_distance_samples)
 
 print(f"Detected peaks: {len(peaks)} (prom={used_prom:.4f}, height={used_height:.4f})")
 
@@ -0,0 +1,79 @@
+from collections import namedtuple
+
+import numpy as np
+
+UINT32_RANGE = 1 << 32  # millis() wraps after ~49.7 days
+MIN_GAP_MS = 1000       # never call anything shorter than this a pause
+GAP_FACTOR = 10         # ... or shorter than this many nominal sample intervals
+
+break_dtype = np.dtype([
+    ('index', np.int64),    # first sample of the new segment
+    ('kind', 'U5'),         # 'reset' (firmware reboot) or 'pause' (logging stopped)
+    ('gap_ms', np.int64),   # raw timestamp jump that caused the break
+])
+
+# t_ms:     monotonic int64 milliseconds, same length as the input
+# segments: (k, 2) int64 array of [start, stop) sample ranges with no breaks inside
+# breaks:   structured array (break_dtype) describing each boundary between segments
+# dt_ms:    nominal sample interval, float ms (half the median span of two forward steps)
+Timeline = namedtuple('Timeline', ['t_ms', 'segments', 'breaks', 'dt_ms'])
+
+
+def unwrap_timestamps(timestamp, gap_ms=None):
+    """Turn firmware uint32 millis into a monotonic int64 timeline.
+
+    - a backwards jump of more than half the uint32 range is a real millis()
+      rollover and is unwrapped by adding 2**32, keeping time continuous;
+    - any other backwards jump is a firmware reset: the new run is placed one
+      nominal interval after the previous sample and starts a new segment;
+    - a forward jump larger than gap_ms (default: 10 nominal intervals, at
+      least 1 s) is a logging pause: real time is kept, but a new segment starts.
+
+    Everything is done with whole-array numpy operations.
+    """
+    ts = np.asarray(timestamp).astype(np.int64)
+    n = len(ts)
+    if n == 0:
+        return Timeline(ts, np.empty((0, 2), dtype=np.int64), np.empty(0, dtype=break_dtype), 0.0)
+
+    d = np.diff(ts)
+    wrapped = d < -(UINT32_RANGE // 2)
+    d[wrapped] += UINT32_RANGE
+
+    # Over pairs of steps, so a period between whole millis (7.5 ms logged as
+    # 7, 8, 7, 8, ...) comes out exact instead of rounded to one of them
+    forward = d[d > 0]
+    pairs = (d[:-1] + d[1:])[(d[:-1] > 0) & (d[1:] > 0)]
+    if len(pairs):
+        dt_ms = float(np.median(pairs)) / 2
+    else:
+        dt_ms = float(np.median(forward)) if len(forward) else 0.0
+    if gap_ms is None:
+        gap_ms = max(MIN_GAP_MS, GAP_FACTOR * dt_ms)
+
+    reset = d < 0
+    pause = d > gap_ms
+    raw_gaps = d[reset | pause]
+    d[reset] = round(dt_ms)  # t_ms stays whole milliseconds
+
+    t_ms = np.empty(n, dtype=np.int64)
+    t_ms[0] = ts[0]
+    np.cumsum(d, out=t_ms[1:])
+    t_ms[1:] += ts[0]
+
+    # ---- Gap / reset index ----
+    break_at = np.flatnonzero(reset | pause)
+    breaks = np.empty(len(break_at), dtype=break_dtype)
+    breaks['index'] = break_at + 1
+    breaks['kind'] = np.where(reset[break_at], 'reset', 'pause')
+    breaks['gap_ms'] = raw_gaps
+
+    bounds = np.concatenate(([0], break_at + 1, [n]))
+    segments = np.column_stack((bounds[:-1], bounds[1:]))
+    return Timeline(t_ms, segments, breaks, dt_ms)
+
+
+def iter_segments(timeline):
+    """Yield a slice for each contiguous segment of the timeline."""
+    for start, stop in timeline.segments:
+        yield slice(int(start), int(stop))
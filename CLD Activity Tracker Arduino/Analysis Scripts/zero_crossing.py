@@ -0,0 +1,114 @@
+import numpy as np
+
+
+# ---- 1. Batch ZCR ----
+def _window_bounds(window_size):
+    # Same centring as np.convolve(crossings, np.ones(window_size), mode='same'):
+    # the value at sample k counts crossings arriving at samples [k - w//2 + 1, k + (w-1)//2 + 1]
+    return window_size // 2 - 1, (window_size - 1) // 2 + 1
+
+
+def crossings(data):
+    """1 where the sign changes from the previous sample, else 0; crossings[0] is always 0."""
+    sign = np.sign(np.asarray(data))
+    out = np.zeros(len(sign), dtype=np.int8)
+    np.not_equal(sign[1:], sign[:-1], out=out[1:], casting='unsafe')
+    return out
+
+
+def zero_crossing_rate(data, window_size):
+    """Fraction of sign changes in a centred sliding window, one value per sample.
+
+    Equal to the old np.convolve(np.diff(np.sign(data)) != 0, np.ones(w), 'same') / w
+    on its n - 1 values, plus the last sample, so the result lines up with data
+    and needs no trimming. Computed from a cumulative sum: O(n) whatever the
+    window size. Windows running off either end count the missing samples as
+    non-crossings, as the convolution did.
+    """
+    cross = crossings(data)
+    n = len(cross)
+    before, after = _window_bounds(window_size)
+    counts = np.zeros(n + 1, dtype=np.int64)
+    np.cumsum(cross, out=counts[1:])
+    k = np.arange(n)
+    hi = np.minimum(k + after + 1, n)
+    lo = np.maximum(k - before, 0)
+    return (counts[hi] - counts[lo]) / window_size
+
+
+# ---- 2. Incremental ZCR for live streams ----
+class ZeroCrossingRate:
+    """zero_crossing_rate() computed chunk by chunk with a ring buffer.
+
+    The window is centred, so the value for sample k is only final once
+    (window_size - 1) // 2 + 1 later samples have arrived: update() returns
+    the values that became final with this chunk, and flush() the rest at
+    the end of the stream. Concatenated, they are identical to
+    zero_crossing_rate() on the whole stream. Work per sample is O(1): the
+    ring holds the last window_size crossings and a running count.
+    """
+
+    def __init__(self, window_size):
+        self.window_size = window_size
+        self.lag = _window_bounds(window_size)[1]
+        self.reset()
+
+    def reset(self):
+        self._ring = np.zeros(self.window_size, dtype=np.int8)
+        self._count = 0        # crossings currently in the ring
+        self._n = 0            # crossings pushed so far (= samples seen, then flush padding)
+        self._samples = 0
+        self._last_sign = None
+
+    def _push(self, cross):
+        """Slide the window over new crossings; returns the window count after each one."""
+        w, m, length = self.window_size, self._n, len(cross)
+        k = min(length, w)
+        leaving = np.empty(length, dtype=np.int64)
+        leaving[:k] = self._ring[(m + np.arange(k)) % w]
+        leaving[k:] = cross[:length - k]
+        sums = self._count + np.cumsum(cross.astype(np.int64) - leaving)
+        self._ring[(m + length - k + np.arange(k)) % w] = cross[length - k:]
+        if length:
+            self._count = int(sums[-1])
+        self._n += length
+        return sums
+
+    def _emit(self, sums, first_index):
+        # sums[i] closes the window of output sample first_index + i - lag
+        skip = max(self.lag - first_index, 0)
+        return sums[skip:] / self.window_size
+
+    def update(self, chunk):
+        """Feed samples; returns the ZCR values that are now final (possibly none)."""
+        sign = np.sign(np.asarray(chunk))
+        if len(sign) == 0:
+            return np.empty(0)
+        cross = np.empty(len(sign), dtype=np.int8)
+        cross[0] = 0 if self._last_sign is None else sign[0] != self._last_sign
+        np.not_equal(sign[1:], sign[:-1], out=cross[1:], casting='unsafe')
+        self._last_sign = sign[-1]
+        first = self._n
+        self._samples += len(sign)
+        return self._emit(self._push(cross), first)
+
+    def flush(self):
+        """End of stream: the remaining values, with the window's future counted as quiet."""
+        # Always a full lag of padding: a stream shorter than lag still owes all its values
+        pending = self.lag if self._samples else 0
+        first = self._n
+        return self._emit(self._push(np.zeros(pending, dtype=np.int8)), first)
+
+
+if __name__ == '__main__':
+    rng = np.random.default_rng(0)
+    # Streams longer and shorter than the window's lag, in uneven chunks
+    for n, window_size in [(5000, 221), (31, 221), (1, 4), (300, 1)]:
+        data = rng.standard_normal(n)
+        zcr = ZeroCrossingRate(window_size)
+        cuts = np.sort(rng.integers(0, n, 8))
+        parts = [zcr.update(chunk) for chunk in np.split(data, cuts)] + [zcr.flush()]
+        streamed = np.concatenate(parts)
+        assert len(streamed) == n, (n, window_size, len(streamed))
+        assert np.allclose(streamed, zero_crossing_rate(data, window_size)), (n, window_size)
+        print(f"{n} samples, window {window_size}: streamed == batch")